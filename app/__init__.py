@@ -1,12 +1,6 @@
-# ruff: noqa: E402
-
-import asyncio
-import logging
 import os
-from typing import AsyncIterable
 
 from aiocache import caches
-from aiostream import stream
 
 
 def resolve_cache_config():
@@ -14,79 +8,48 @@ def resolve_cache_config():
         return {
             "cache": "app.utils.cache.GcsCache",
             "bucket_name": bucket_name,
+            "serializer": {
+                "class": "app.utils.serializers.CompactSerializer",
+                "compression": os.environ.get("CACHE_COMPRESSION", "zlib"),
+            },
+        }
+    elif path := os.environ.get("SQLITE_CACHE_PATH", None):
+        return {
+            "cache": "app.utils.cache.SqliteCache",
+            "path": path,
+            "vacuum_interval": float(
+                os.environ.get("SQLITE_CACHE_VACUUM_INTERVAL", 600)
+            ),
+            "serializer": {
+                "class": "app.utils.serializers.CompactSerializer",
+                "compression": os.environ.get("CACHE_COMPRESSION", "zlib"),
+            },
         }
     else:
-        return {"cache": "aiocache.SimpleMemoryCache"}
-
-
-caches.set_config({"default": resolve_cache_config()})
-
-
-from heekkr.common_pb2 import LatLng
-from heekkr.resolver_pb2 import (
-    GetLibrariesRequest,
-    GetLibrariesResponse,
-    SearchRequest,
-    SearchResponse,
-)
-from heekkr.library_pb2 import Library
-from heekkr.resolver_pb2_grpc import ResolverServicer
-
-from .core import Library as ServiceLibrary, services
-
+        return {
+            "cache": "app.utils.cache.BoundedMemoryCache",
+            "max_bytes": int(
+                os.environ.get("MEMORY_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+            ),
+            "policy": os.environ.get("MEMORY_CACHE_POLICY", "lru"),
+            "stats_interval": float(os.environ.get("MEMORY_CACHE_STATS_INTERVAL", 300)),
+        }
 
-logger = logging.getLogger(__name__)
 
+_caches_configured = False
 
-class Resolver(ResolverServicer):
-    async def GetLibraries(
-        self, request: GetLibrariesRequest, context
-    ) -> GetLibrariesResponse:
-        logger.debug("GetLibraries begin")
-        libraries = [
-            convert_library(library)
-            for libraries in await asyncio.gather(
-                *(service.get_libraries() for _, service in services.items())
-            )
-            for library in libraries
-        ]
-        logger.debug(f"GetLibraries end {len(libraries)=}")
-        return GetLibrariesResponse(
-            libraries=libraries,
-        )
 
-    async def Search(
-        self, request: SearchRequest, context
-    ) -> AsyncIterable[SearchResponse]:
-        library_ids = set(request.library_ids or ())
-        service_ids = set(library_id.split(":")[0] for library_id in library_ids)
+def configure_caches(force: bool = False) -> None:
+    global _caches_configured
+    if _caches_configured and not force:
+        return
+    caches.set_config({"default": resolve_cache_config()})
+    _caches_configured = True
 
-        async with stream.merge(
-            *(
-                service.search(
-                    request.term,
-                    {
-                        library_id
-                        for library_id in library_ids
-                        if library_id.startswith(f"{name}:")
-                    },
-                )
-                for name, service in services.items()
-                if name in service_ids
-            )
-        ).stream() as streamer:
-            async for entity in streamer:
-                yield SearchResponse(entities=[entity])
 
+def __getattr__(name: str):
+    if name in ("Resolver", "convert_library"):
+        from . import resolver
 
-def convert_library(lib: ServiceLibrary) -> Library:
-    return Library(
-        id=lib.id,
-        name=lib.name,
-        resolver_id="simple",
-        coordinate=(
-            LatLng(latitude=lib.coordinate.latitude, longitude=lib.coordinate.longitude)
-            if lib.coordinate
-            else None
-        ),
-    )
+        return getattr(resolver, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
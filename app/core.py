@@ -1,8 +1,10 @@
 import abc
 import dataclasses
-from typing import AsyncIterable, Callable, Iterable
+import importlib
+from typing import TYPE_CHECKING, AsyncIterable, Callable, Iterable, Iterator, Mapping
 
-from heekkr.resolver_pb2 import SearchEntity
+if TYPE_CHECKING:
+    from heekkr.resolver_pb2 import SearchEntity
 
 
 @dataclasses.dataclass
@@ -26,17 +28,58 @@ class Service(metaclass=abc.ABCMeta):
     @abc.abstractmethod
     def search(
         self, keyword: str, library_ids: Iterable[str]
-    ) -> AsyncIterable[SearchEntity]:
+    ) -> AsyncIterable["SearchEntity"]:
         ...
 
+    async def fetch_libraries(self) -> Iterable[Library]:
+        # Straight from the source, skipping cached lists and the gazetteer.
+        return await self.get_libraries()
+
+    async def warm_up(self) -> None:
+        await self.get_libraries()
+
+
+class ServiceRegistry(Mapping[str, Service]):
+    def __init__(self, modules: dict[str, str]) -> None:
+        self.modules = modules
+        self.loaded: dict[str, Service] = {}
+
+    def register(self, name: str, service: Service) -> None:
+        self.loaded[name] = service
+
+    def __getitem__(self, name: str) -> Service:
+        if name not in self.loaded and name in self.modules:
+            importlib.import_module(self.modules[name])
+        return self.loaded[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.modules or name in self.loaded
+
+    def __iter__(self) -> Iterator[str]:
+        return iter({**self.modules, **self.loaded})
+
+    def __len__(self) -> int:
+        return len({**self.modules, **self.loaded})
+
 
 def register_service(name: str) -> Callable[[type[Service]], type[Service]]:
     def inner(service: type[Service]) -> type[Service]:
-        services[name] = service()
+        services.register(name, service())
         return service
 
     return inner
 
 
-services: dict[str, Service] = {}
-from app.services import *  # noqa: E402, F403
+services = ServiceRegistry(
+    {
+        "gdlib": "app.services.gdlib",
+        "seoul-songpa": "app.services.seoul_songpa",
+        "sblib": "app.services.sblib",
+        "seoul-gangnam": "app.services.seoul_gangnam",
+        "seoul-gwangjin": "app.services.seoul_gwangjin",
+        # "seoul-gwanak": "app.services.seoul_gwanak",
+        "seoul-dongdaemun": "app.services.seoul_dongdaemun",
+        "seoul-mapo": "app.services.seoul_mapo",
+        "seoul-seodaemun": "app.services.seoul_seodaemun",
+    }
+)
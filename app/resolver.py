@@ -0,0 +1,199 @@
+import asyncio
+import logging
+from typing import AsyncIterable
+
+import grpc
+from aiostream import stream
+from heekkr.common_pb2 import LatLng
+from heekkr.resolver_pb2 import (
+    GetLibrariesRequest,
+    GetLibrariesResponse,
+    SearchRequest,
+    SearchResponse,
+)
+from heekkr.library_pb2 import Library
+from heekkr.resolver_pb2_grpc import ResolverServicer
+
+from . import configure_caches
+from .core import Library as ServiceLibrary, services
+from .utils.admission import AdmissionController, Priority, Rejected
+from .utils.cost import accounting
+from .utils.introspection import InflightSearches
+from .utils.looplag import LoopLagMonitor
+from .utils.memory import profiled
+from .utils.scheduling import client_from_context, current_client
+from .utils.spatial import LibraryIndex
+from .utils.tracing import SEARCH_TRANSACTION, reject, transaction
+from .utils.upstream import UpstreamTracker
+
+
+logger = logging.getLogger(__name__)
+
+
+class Resolver(ResolverServicer):
+    def __init__(self) -> None:
+        configure_caches()
+        self.library_index = LibraryIndex()
+        self.loop_lag = LoopLagMonitor()
+        self.upstreams = UpstreamTracker()
+        self.searches = InflightSearches()
+        self.library_tables: dict[str, dict] = {}
+        self.admission = AdmissionController(loop_lag=lambda: self.loop_lag.smoothed)
+
+    @property
+    def inflight_searches(self) -> int:
+        return sum(
+            search.stage == "running" for search in self.searches.searches.values()
+        )
+
+    async def admit(self, priority: Priority, context) -> None:
+        try:
+            await self.admission.acquire(priority)
+        except Rejected as e:
+            reject()
+            if context is None:
+                raise
+            await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, str(e))
+
+    async def get_libraries(self) -> list[ServiceLibrary]:
+        names = list(services)
+        tables = await asyncio.gather(
+            *(services[name].get_libraries() for name in names)
+        )
+        for name, table in zip(names, tables):
+            self.library_tables[name] = {
+                "size": len(table),
+                "fingerprint": hash(tuple(library.id for library in table)),
+            }
+        libraries = [library for table in tables for library in table]
+        self.library_index.update(libraries)
+        return libraries
+
+    async def nearest_libraries(
+        self,
+        latitude: float,
+        longitude: float,
+        limit: int | None = None,
+        radius_km: float | None = None,
+    ) -> list[tuple[str, float]]:
+        await self.get_libraries()
+        return self.library_index.index.nearest(latitude, longitude, limit, radius_km)
+
+    async def GetLibraries(
+        self, request: GetLibrariesRequest, context
+    ) -> GetLibrariesResponse:
+        with transaction("heekkr.Resolver/GetLibraries"), accounting(
+            "GetLibraries", context
+        ), profiled("GetLibraries"):
+            logger.debug("GetLibraries begin")
+            await self.admit(Priority.HIGH, context)
+            try:
+                libraries = await self.get_libraries()
+                if near := await parse_near_metadata(context):
+                    by_id = {library.id: library for library in libraries}
+                    # The shared index may already be rebuilt from another table.
+                    libraries = [
+                        by_id[library_id]
+                        for library_id, _ in self.library_index.index.nearest(*near)
+                        if library_id in by_id
+                    ]
+            finally:
+                self.admission.release()
+            logger.debug(f"GetLibraries end {len(libraries)=}")
+            return GetLibrariesResponse(
+                libraries=[convert_library(library) for library in libraries],
+            )
+
+    async def Search(
+        self, request: SearchRequest, context
+    ) -> AsyncIterable[SearchResponse]:
+        client = client_from_context(context)
+        current_client.set(client)
+        with transaction(SEARCH_TRANSACTION), accounting(
+            "Search",
+            context,
+            client=client.id,
+            term=request.term,
+            services=sorted({id.split(":")[0] for id in request.library_ids}),
+        ), profiled("Search", client=client.id, term=request.term):
+            async for response in self._search(request, context, client.id):
+                yield response
+
+    async def _search(
+        self, request: SearchRequest, context, client_id: str = ""
+    ) -> AsyncIterable[SearchResponse]:
+        library_ids = set(request.library_ids or ())
+        service_ids = set(library_id.split(":")[0] for library_id in library_ids)
+        names = sorted(name for name in service_ids if name in services)
+
+        search_id, search = self.searches.register(request.term, client_id, names)
+        try:
+            await self.admit(Priority.LOW, context)
+            search.stage = "running"
+            try:
+                async with stream.merge(
+                    *(
+                        search.follow(
+                            name,
+                            self.upstreams.track(
+                                name,
+                                services[name].search(
+                                    request.term,
+                                    {
+                                        library_id
+                                        for library_id in library_ids
+                                        if library_id.startswith(f"{name}:")
+                                    },
+                                ),
+                            ),
+                        )
+                        for name in names
+                    )
+                ).stream() as streamer:
+                    async for entity in streamer:
+                        yield SearchResponse(entities=[entity])
+            finally:
+                self.admission.release()
+        finally:
+            self.searches.unregister(search_id)
+
+
+async def parse_near_metadata(
+    context,
+) -> tuple[float, float, int | None, float | None] | None:
+    if context is None:
+        return None
+    metadata = dict(context.invocation_metadata() or ())
+    if not (near := metadata.get("x-near")):
+        return None
+    try:
+        latitude, longitude = (float(v) for v in near.split(","))
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValueError(near)
+        limit = int(v) if (v := metadata.get("x-near-limit")) else None
+        radius_km = float(v) if (v := metadata.get("x-near-radius-km")) else None
+        if (limit is not None and limit < 0) or (
+            radius_km is not None and not radius_km >= 0
+        ):
+            raise ValueError(near)
+    except ValueError:
+        await context.abort(
+            grpc.StatusCode.INVALID_ARGUMENT,
+            "x-near must be 'latitude,longitude' in degrees"
+            " with non-negative numeric limit/radius",
+        )
+        raise
+    return latitude, longitude, limit, radius_km
+
+
+def convert_library(lib: ServiceLibrary) -> Library:
+    return Library(
+        id=lib.id,
+        name=lib.name,
+        resolver_id="simple",
+        coordinate=(
+            LatLng(latitude=lib.coordinate.latitude, longitude=lib.coordinate.longitude)
+            if lib.coordinate
+            else None
+        ),
+    )
@@ -1,13 +0,0 @@
-# ruff: noqa: F401
-
-from . import (
-    gdlib,
-    seoul_songpa,
-    sblib,
-    seoul_gangnam,
-    seoul_gwangjin,
-    # seoul_gwanak,
-    seoul_dongdaemun,
-    seoul_mapo,
-    seoul_seodaemun,
-)
@@ -1,12 +1,13 @@
 import abc
+import asyncio
+import contextlib
 import logging
 import re
 from io import BytesIO
-from typing import AsyncIterable, Iterable
+from typing import AsyncIterable, AsyncIterator, Iterable
 import urllib.parse
 
-from aiocache import cached
-from aiohttp import ClientSession
+from aiohttp import ClientError, ClientResponse, ClientSession
 from bs4 import BeautifulSoup, Tag
 from heekkr.book_pb2 import Book, PublishDate
 from heekkr.common_pb2 import Date, DateTime
@@ -19,10 +20,17 @@ from heekkr.holding_pb2 import (
 )
 from heekkr.resolver_pb2 import SearchEntity
 from multidict import MultiDict
-from openpyxl.reader.excel import load_workbook
 
 from app.core import Coordinate, Library
+from app.utils.cache import cached_with_refresh
+from app.utils.cost import parse_cpu
+from app.utils.gazetteer import Gazetteer
+from app.utils.http import get_session
+from app.utils.scheduling import get_scheduler
 from app.utils.kakao import Kakao
+from app.utils.memory import tracked
+from app.utils.metrics import timed
+from app.utils.tracing import span
 from app.utils.text import select_closest
 
 
@@ -83,10 +91,51 @@ class JnetSearcher(metaclass=abc.ABCMeta):
     def transform_library_name_for_search(self, name: str) -> str:
         return name
 
-    async def get_libraries_response(self) -> str:
-        async with ClientSession(self.url_base) as session, session.get(
-            self.path_search_index
+    def get_gazetteer(self) -> Gazetteer:
+        return Gazetteer.default()
+
+    @property
+    def service_id(self) -> str:
+        return self.id_prefix.removesuffix(":")
+
+    @property
+    def session(self) -> ClientSession:
+        return get_session(self.url_base)
+
+    @contextlib.asynccontextmanager
+    async def request(
+        self, method: str, path: str, **kwargs
+    ) -> AsyncIterator[ClientResponse]:
+        async with get_scheduler(self.url_base).slot(), self.session.request(
+            method, path, **kwargs
         ) as response:
+            yield response
+
+    async def warm_up(self) -> None:
+        self.prime_parsers()
+        await asyncio.gather(self.open_connection(), self.get_libraries())
+
+    def prime_parsers(self) -> None:
+        # Compiles the CSS selectors (soupsieve caches them) and loads lxml.
+        soup = BeautifulSoup("<html><body></body></html>", "lxml")
+        self._get_libraries_select_items(soup)
+        self.search_select_results(soup)
+        try:
+            _ = self.path_export_excel
+        except NotImplementedError:
+            pass
+        else:
+            import openpyxl.reader.excel  # noqa: F401
+
+    async def open_connection(self) -> None:
+        try:
+            async with self.request("HEAD", self.path_search_index) as response:
+                await response.read()
+        except ClientError as e:
+            logger.debug(f"{self.id_prefix} couldn't open connection: {e!r}")
+
+    async def get_libraries_response(self) -> str:
+        async with self.request("GET", self.path_search_index) as response:
             return await response.text()
 
     def _get_libraries_select_items(self, root: Tag) -> Iterable[Tag]:
@@ -95,32 +144,49 @@ class JnetSearcher(metaclass=abc.ABCMeta):
     def _get_libraries_select_input(self, item: Tag) -> Tag | None:
         return item.select_one("input[name='searchLibraryArr']")
 
-    async def _get_libraries(self) -> list[Library]:
+    async def _get_libraries(self, gazetteer: Gazetteer | None = None) -> list[Library]:
         text = await self.get_libraries_response()
-        soup = BeautifulSoup(text, "lxml")
-        res = []
-        async with Kakao() as kakao:
+        items = []
+        with parse_cpu(), tracked(self.service_id, "libraries"):
+            soup = BeautifulSoup(text, "lxml")
             for li in self._get_libraries_select_items(soup):
                 name = self.normalize_library_name(li.text.strip())
                 if input := self._get_libraries_select_input(li):
                     key = input.attrs["value"]
                     if key == "ALL":
                         continue
-                    coordinate = None
-                    if address := await kakao.search_keyword(
-                        self.transform_library_name_for_search(name)
-                    ):
-                        coordinate = Coordinate(latitude=address.y, longitude=address.x)
-                    res.append(
-                        Library(
-                            id=f"{self.id_prefix}{key}",
-                            name=name,
-                            coordinate=coordinate,
-                        )
-                    )
-        return res
+                    items.append((key, name))
+
+        if gazetteer is None:
+            gazetteer = self.get_gazetteer()
+        missing = [
+            (key, name)
+            for key, name in items
+            if f"{self.id_prefix}{key}" not in gazetteer
+        ]
+        addresses = await Kakao.shared().search_keywords(
+            self.transform_library_name_for_search(name) for _, name in missing
+        )
+        geocoded = {
+            key: Coordinate(latitude=address.y, longitude=address.x)
+            for (key, _), address in zip(missing, addresses)
+            if address
+        }
+        return [
+            Library(
+                id=f"{self.id_prefix}{key}",
+                name=name,
+                coordinate=gazetteer.get(f"{self.id_prefix}{key}") or geocoded.get(key),
+            )
+            for key, name in items
+        ]
 
-    @cached(ttl=60 * 60 * 24, alias="default")
+    async def fetch_libraries(self) -> list[Library]:
+        return await self._get_libraries(Gazetteer())
+
+    @cached_with_refresh(
+        ttl=60 * 60 * 24, alias="default", service=lambda self: self.service_id
+    )
     async def get_libraries(self) -> list[Library]:
         logger.debug(f"{self.id_prefix} get_libraries BEGIN")
         libraries = await self._get_libraries()
@@ -146,7 +212,8 @@ class JnetSearcher(metaclass=abc.ABCMeta):
         library_search_keys = [
             await self.map_library_to_searchkey(lid) for lid in library_ids
         ]
-        async with ClientSession(self.url_base) as session, session.post(
+        async with self.request(
+            "POST",
             self.path_search,
             data=self.search_query(keyword, library_search_keys),
         ) as response:
@@ -161,9 +228,15 @@ class JnetSearcher(metaclass=abc.ABCMeta):
     async def search(
         self, keyword: str, library_ids: Iterable[str]
     ) -> AsyncIterable[SearchEntity]:
-        text = await self.search_response(keyword, library_ids)
-        soup = BeautifulSoup(text, "lxml")
-        results = self.search_select_results(soup)
+        with timed(self.service_id, "fetch"), span(
+            "http.client", f"{self.service_id} search"
+        ):
+            text = await self.search_response(keyword, library_ids)
+        with timed(self.service_id, "parse"), span(
+            "parse", self.service_id
+        ), parse_cpu(), tracked(self.service_id, "parse"):
+            soup = BeautifulSoup(text, "lxml")
+            results = self.search_select_results(soup)
         logger.debug(f"search result length = {len(results)}")
         if len(results) == 0:
             return
@@ -196,32 +269,36 @@ class JnetSearcher(metaclass=abc.ABCMeta):
 
         # Fallback
         for li in results:
-            library, location = await self.parse_site(li)
-            yield SearchEntity(
-                book=Book(
-                    isbn=self.parse_isbn(li),
-                    title=self.parse_title(li),
-                    author=self.parse_author(li),
-                    publisher=self.parse_publisher(li),
-                    publish_date=self.parse_publish_date(li),
-                ),
-                holding_summaries=[
-                    HoldingSummary(
-                        library_id=library.id,
-                        location=location,
-                        call_number=self.parse_call_number(li),
-                        status=self.parse_holding_status(li),
-                    )
-                ],
-                url=self.parse_url(li),
-            )
+            with timed(self.service_id, "match"):
+                library, location = await self.parse_site(li)
+            with timed(self.service_id, "build"):
+                entity = SearchEntity(
+                    book=Book(
+                        isbn=self.parse_isbn(li),
+                        title=self.parse_title(li),
+                        author=self.parse_author(li),
+                        publisher=self.parse_publisher(li),
+                        publish_date=self.parse_publish_date(li),
+                    ),
+                    holding_summaries=[
+                        HoldingSummary(
+                            library_id=library.id,
+                            location=location,
+                            call_number=self.parse_call_number(li),
+                            status=self.parse_holding_status(li),
+                        )
+                    ],
+                    url=self.parse_url(li),
+                )
+            yield entity
 
     async def export_to_text_response(self, infos: Iterable[dict]) -> str | None:
         try:
             path = self.path_export_text
         except NotImplementedError:
             return None
-        async with ClientSession(self.url_base) as session, session.post(
+        async with self.request(
+            "POST",
             path,
             data=MultiDict(("check", info["id"]) for info in infos),
         ) as response:
@@ -233,28 +310,42 @@ class JnetSearcher(metaclass=abc.ABCMeta):
             path = self.path_export_excel
         except NotImplementedError:
             return None
-        async with ClientSession(self.url_base) as session, session.get(
+        async with self.request(
+            "GET",
             path,
             params=[("check", info["id"]) for info in infos],
         ) as response:
             if response.ok:
-                ws = load_workbook(
-                    BytesIO(await response.content.read()), data_only=True
-                ).active
-                return ws.values
+                return self.read_excel(await response.content.read())
+
+    def read_excel(self, content: bytes) -> list[tuple]:
+        from openpyxl.reader.excel import load_workbook
+
+        with parse_cpu(), tracked(self.service_id, "export"):
+            ws = load_workbook(BytesIO(content), data_only=True).active
+            return list(ws.values)
 
     async def export(
         self,
         infos: Iterable[dict],
     ) -> AsyncIterable[SearchEntity]:
         header = None
-        if text := await self.export_to_text_response(infos):
-            header_text, *data_texts = text.splitlines()
-            header = header_text.split("\t")
-            data = [line.split("\t") for line in data_texts]
+        with timed(self.service_id, "export"), span(
+            "http.client", f"{self.service_id} export text"
+        ):
+            text = await self.export_to_text_response(infos)
+        if text:
+            with tracked(self.service_id, "export"):
+                header_text, *data_texts = text.splitlines()
+                header = header_text.split("\t")
+                data = [line.split("\t") for line in data_texts]
 
         if header is None:
-            if res := await self.export_to_excel_response(infos):
+            with timed(self.service_id, "export"), span(
+                "http.client", f"{self.service_id} export excel"
+            ):
+                res = await self.export_to_excel_response(infos)
+            if res:
                 header, *data = res
 
         if header is None:
@@ -295,31 +386,35 @@ class JnetSearcher(metaclass=abc.ABCMeta):
             publish_year = get(i_publish_year)
             publish_year = int(publish_year) if publish_year else None
 
+            with timed(self.service_id, "match"):
+                library = select_closest(
+                    [(lib, lib.name) for lib in await self.get_libraries()],
+                    get(i_library),
+                )
             args = info["args"]
-            yield SearchEntity(
-                book=Book(
-                    isbn=isbn,
-                    title=get(i_title),
-                    author=get(i_author),
-                    publisher=get(i_publisher),
-                    publish_date=(
-                        PublishDate(year=publish_year) if publish_year else None
+            with timed(self.service_id, "build"):
+                entity = SearchEntity(
+                    book=Book(
+                        isbn=isbn,
+                        title=get(i_title),
+                        author=get(i_author),
+                        publisher=get(i_publisher),
+                        publish_date=(
+                            PublishDate(year=publish_year) if publish_year else None
+                        ),
+                        **args["book"],
                     ),
-                    **args["book"],
-                ),
-                holding_summaries=[
-                    HoldingSummary(
-                        library_id=select_closest(
-                            [(lib, lib.name) for lib in await self.get_libraries()],
-                            get(i_library),
-                        ).id,
-                        location=get(i_location),
-                        call_number=get(i_call_number),
-                        **args["holding_summary"],
-                    )
-                ],
-                **args["entity"],
-            )
+                    holding_summaries=[
+                        HoldingSummary(
+                            library_id=library.id,
+                            location=get(i_location),
+                            call_number=get(i_call_number),
+                            **args["holding_summary"],
+                        )
+                    ],
+                    **args["entity"],
+                )
+            yield entity
 
     def parse_id(self, root: Tag) -> str | None:
         if elem := root.select_one("input[name='check']"):
@@ -46,6 +46,12 @@ class GdlibService(Service):
     async def get_libraries(self) -> Iterable[Library]:
         return await self.searcher.get_libraries()
 
+    async def fetch_libraries(self) -> Iterable[Library]:
+        return await self.searcher.fetch_libraries()
+
+    async def warm_up(self) -> None:
+        await self.searcher.warm_up()
+
     def search(
         self, keyword: str, library_ids: Iterable[str]
     ) -> AsyncIterable[SearchEntity]:
@@ -1,16 +1,14 @@
 from typing import AsyncIterable, Iterable
 
-from bs4 import BeautifulSoup
+from bs4 import Tag
 from heekkr.resolver_pb2 import SearchEntity
 
-from app.core import Library, Service, register_service, Coordinate
+from app.core import Library, Service, register_service
 from app.services.common.jnet import JnetSearcher
 
 
 __all__ = ("SeoulGwanakService",)
 
-from app.utils.kakao import Kakao
-
 
 class Searcher(JnetSearcher):
     @property
@@ -40,30 +38,8 @@ class Searcher(JnetSearcher):
     def transform_library_name_for_search(self, name: str) -> str:
         return f"서울시 관악구 {name}"
 
-    async def _get_libraries(self) -> list[Library]:
-        text = await self.get_libraries_response()
-        soup = BeautifulSoup(text, "lxml")
-        res = []
-        async with Kakao() as kakao:
-            for li in soup.select("ul.chk_lib li"):
-                name = self.normalize_library_name(li.text.strip())
-                if input := li.select_one("input[name='searchLibraryArr']"):
-                    key = input.attrs["value"]
-                    if key == "ALL":
-                        continue
-                    coordinate = None
-                    if address := await kakao.search_keyword(
-                        self.transform_library_name_for_search(name)
-                    ):
-                        coordinate = Coordinate(latitude=address.y, longitude=address.x)
-                    res.append(
-                        Library(
-                            id=f"{self.id_prefix}{key}",
-                            name=name,
-                            coordinate=coordinate,
-                        )
-                    )
-        return res
+    def _get_libraries_select_items(self, root: Tag) -> Iterable[Tag]:
+        return root.select("ul.chk_lib li")
 
 
 @register_service("seoul-gwanak")
@@ -74,6 +50,12 @@ class SeoulGwanakService(Service):
     async def get_libraries(self) -> Iterable[Library]:
         return await self.searcher.get_libraries()
 
+    async def fetch_libraries(self) -> Iterable[Library]:
+        return await self.searcher.fetch_libraries()
+
+    async def warm_up(self) -> None:
+        await self.searcher.warm_up()
+
     def search(
         self, keyword: str, library_ids: Iterable[str]
     ) -> AsyncIterable[SearchEntity]:
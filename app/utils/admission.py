@@ -0,0 +1,123 @@
+import asyncio
+import collections
+import contextlib
+import enum
+import logging
+import os
+import time
+from typing import AsyncIterator, Callable
+
+
+logger = logging.getLogger(__name__)
+
+
+ADMISSION_MAX_CONCURRENT = int(os.environ.get("ADMISSION_MAX_CONCURRENT", 32))
+ADMISSION_MAX_QUEUE = int(os.environ.get("ADMISSION_MAX_QUEUE", 64))
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", 5))
+ADMISSION_MAX_QUEUE_DELAY = float(os.environ.get("ADMISSION_MAX_QUEUE_DELAY", 1))
+ADMISSION_MAX_LOOP_LAG = float(os.environ.get("ADMISSION_MAX_LOOP_LAG", 1))
+
+
+class Priority(enum.IntEnum):
+    HIGH = 0
+    LOW = 1
+
+
+class Rejected(Exception):
+    pass
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_concurrent: int = ADMISSION_MAX_CONCURRENT,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT,
+        max_queue_delay: float = ADMISSION_MAX_QUEUE_DELAY,
+        max_loop_lag: float = ADMISSION_MAX_LOOP_LAG,
+        loop_lag: Callable[[], float] = lambda: 0.0,
+    ) -> None:
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_queue_delay = max_queue_delay
+        self.max_loop_lag = max_loop_lag
+        self.loop_lag = loop_lag
+        self.active = 0
+        self.queue_delay = 0.0
+        self.waiters: dict[Priority, collections.deque[asyncio.Future]] = {
+            priority: collections.deque() for priority in Priority
+        }
+        self.counters = collections.Counter()
+
+    @property
+    def queued(self) -> int:
+        return sum(len(waiters) for waiters in self.waiters.values())
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "queue_delay": self.queue_delay,
+            **self.counters,
+        }
+
+    def _reject(self, reason: str) -> Rejected:
+        self.counters["rejected"] += 1
+        logger.info(f"Rejected request: {reason}")
+        return Rejected(reason)
+
+    async def acquire(self, priority: Priority = Priority.LOW) -> float:
+        if priority is Priority.LOW:
+            # Only the shedable class is refused outright under load.
+            if (lag := self.loop_lag()) > self.max_loop_lag:
+                raise self._reject(f"event loop lag {lag:.3f}s")
+            if self.queued and self.queue_delay > self.max_queue_delay:
+                raise self._reject(f"queue delay {self.queue_delay:.3f}s")
+
+        ahead = sum(len(self.waiters[p]) for p in Priority if p <= priority)
+        if self.active < self.max_concurrent and not ahead:
+            self.active += 1
+            self.queue_delay = 0.0
+            self.counters["admitted"] += 1
+            return 0.0
+        if self.queued >= self.max_queue:
+            raise self._reject("queue is full")
+
+        future = asyncio.get_running_loop().create_future()
+        self.waiters[priority].append(future)
+        started_at = time.monotonic()
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await future
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we gave up; pass it on.
+                self.release()
+            elif future in self.waiters[priority]:
+                self.waiters[priority].remove(future)
+            if isinstance(e, TimeoutError):
+                raise self._reject(f"queued for {self.queue_timeout}s") from None
+            raise
+        self.queue_delay = waited = time.monotonic() - started_at
+        self.counters["admitted"] += 1
+        self.counters["queued"] += 1
+        return waited
+
+    def release(self) -> None:
+        for priority in Priority:
+            waiters = self.waiters[priority]
+            while waiters:
+                future = waiters.popleft()
+                if not future.done():
+                    future.set_result(None)
+                    return
+        self.active -= 1
+
+    @contextlib.asynccontextmanager
+    async def admit(self, priority: Priority = Priority.LOW) -> AsyncIterator[float]:
+        waited = await self.acquire(priority)
+        try:
+            yield waited
+        finally:
+            self.release()
@@ -1,13 +1,29 @@
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
 import dataclasses
 import datetime
-import io
+import functools
 import logging
+import math
+import os
 import pickle
+import random
+import sqlite3
+import struct
+import sys
+import time
+from typing import Any, Callable
 
+from aiocache import cached
 from aiocache.base import BaseCache
-from aiocache.serializers import PickleSerializer
-from google.cloud.exceptions import NotFound
-from google.cloud.storage import Client
+from aiocache.serializers import NullSerializer
+
+from app.utils.cost import record_cache
+from app.utils.metrics import timed
+from app.utils.serializers import CompactSerializer
+from app.utils.tracing import span
 
 
 logger = logging.getLogger(__name__)
@@ -19,23 +35,51 @@ class CacheEntity:
     expires_at: datetime.datetime | None
 
 
+ENTITY_MAGIC = b"HKE1"
+ENTITY_HEADER = struct.Struct("!4sd")
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def dump_entity(entity: CacheEntity) -> bytes:
+    if not isinstance(entity.value, bytes):
+        return pickle.dumps(entity)
+    expires_at = (
+        (entity.expires_at - EPOCH).total_seconds() if entity.expires_at else 0.0
+    )
+    return ENTITY_HEADER.pack(ENTITY_MAGIC, expires_at) + entity.value
+
+
+def load_entity(data: bytes) -> CacheEntity:
+    if not data.startswith(ENTITY_MAGIC):
+        return pickle.loads(data)
+    _, expires_at = ENTITY_HEADER.unpack_from(data)
+    return CacheEntity(
+        value=data[ENTITY_HEADER.size :],
+        expires_at=(
+            EPOCH + datetime.timedelta(seconds=expires_at) if expires_at else None
+        ),
+    )
+
+
 class SimpleGcsBackend(BaseCache):
     def __init__(self, bucket_name, **kwargs):
         super().__init__(**kwargs)
+        from google.cloud.storage import Client
+
         self.client = Client()
         self.bucket = self.client.get_bucket(bucket_name)
         logger.debug("SimpleGcsBackend initialized")
 
     async def _get_entity(self, key) -> CacheEntity | None:
         logger.debug("_get_entity")
+        from google.cloud.exceptions import NotFound
+
         blob = self.bucket.blob(key)
-        with io.BytesIO() as f:
-            try:
-                blob.download_to_file(f)
-            except NotFound:
-                return None
-            f.seek(0)
-            return pickle.load(f)
+        try:
+            with span("cache.get", key):
+                return load_entity(blob.download_as_bytes())
+        except NotFound:
+            return None
 
     async def _get(self, key, encoding="utf-8", _conn=None):
         logger.debug(f"_get {key}")
@@ -57,10 +101,10 @@ class SimpleGcsBackend(BaseCache):
     async def _set_entity(self, key, entity: CacheEntity):
         logger.debug("_set_entity")
         blob = self.bucket.blob(key)
-        with io.BytesIO() as f:
-            pickle.dump(entity, f)
-            f.seek(0)
-            blob.upload_from_file(f)
+        with span("cache.set", key):
+            blob.upload_from_string(
+                dump_entity(entity), content_type="application/octet-stream"
+            )
         return True
 
     async def _set(self, key, value, ttl=None, _cas_token=None, _conn=None):
@@ -91,7 +135,8 @@ class SimpleGcsBackend(BaseCache):
     async def _exists(self, key, _conn=None):
         logger.debug(f"_exists {key}")
         blob = self.bucket.blob(key)
-        return blob.exists()
+        with span("cache.exists", key):
+            return blob.exists()
 
     async def _increment(self, key, delta, _conn=None):
         if entity := await self._get_entity(key):
@@ -114,9 +159,12 @@ class SimpleGcsBackend(BaseCache):
         return False
 
     async def _delete(self, key, _conn=None):
+        from google.cloud.exceptions import NotFound
+
         blob = self.bucket.blob(key)
         try:
-            blob.delete()
+            with span("cache.delete", key):
+                blob.delete()
         except NotFound:
             return 0
         return 1
@@ -126,8 +174,586 @@ class GcsCache(SimpleGcsBackend):
     NAME = "gcs"
 
     def __init__(self, serializer=None, **kwargs):
-        super().__init__(serializer=serializer or PickleSerializer(), **kwargs)
+        super().__init__(serializer=serializer or CompactSerializer(), **kwargs)
 
     @classmethod
     def parse_uri_path(cls, path):
         return {}
+
+
+def estimate_size(value: Any) -> int:
+    seen: set[int] = set()
+
+    def visit(obj: Any) -> int:
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+        if hasattr(obj, "ByteSize"):
+            return sys.getsizeof(obj) + obj.ByteSize()
+        size = sys.getsizeof(obj)
+        if isinstance(obj, (str, bytes, bytearray, int, float, bool)) or obj is None:
+            return size
+        if isinstance(obj, dict):
+            return size + sum(visit(k) + visit(v) for k, v in obj.items())
+        if isinstance(obj, (list, tuple, set, frozenset)):
+            return size + sum(visit(item) for item in obj)
+        if dataclasses.is_dataclass(obj):
+            return size + sum(
+                visit(getattr(obj, field.name)) for field in dataclasses.fields(obj)
+            )
+        if hasattr(obj, "__dict__"):
+            return size + visit(vars(obj))
+        return size
+
+    return visit(value)
+
+
+class FrequencySketch:
+    def __init__(self, width: int = 4096, depth: int = 4) -> None:
+        self.width = width
+        self.depth = depth
+        self.table = [[0] * width for _ in range(depth)]
+        self.additions = 0
+        self.sample_size = width * 10
+
+    def _indexes(self, key: str) -> list[int]:
+        return [hash((i, key)) % self.width for i in range(self.depth)]
+
+    def increment(self, key: str) -> None:
+        for row, i in zip(self.table, self._indexes(key)):
+            if row[i] < 15:
+                row[i] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.table = [[count >> 1 for count in row] for row in self.table]
+            self.additions //= 2
+
+    def frequency(self, key: str) -> int:
+        return min(row[i] for row, i in zip(self.table, self._indexes(key)))
+
+
+@dataclasses.dataclass
+class MemoryEntry:
+    value: Any
+    size: int
+    expires_at: float | None
+
+
+class BoundedMemoryBackend(BaseCache):
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_entries: int | None = None,
+        policy: str = "lru",
+        stats_interval: float | None = 300,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        if policy not in ("lru", "tinylfu"):
+            raise ValueError(f"Unknown eviction policy {policy!r}")
+        self.max_bytes = int(max_bytes)
+        self.max_entries = int(max_entries) if max_entries else None
+        self.sketch = FrequencySketch() if policy == "tinylfu" else None
+        self.stats_interval = stats_interval
+
+        self._cache: collections.OrderedDict[
+            str, MemoryEntry
+        ] = collections.OrderedDict()
+        self._bytes = 0
+        self._counters = collections.Counter()
+        self._stats_logged_at = time.monotonic()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._cache),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            **self._counters,
+        }
+
+    def _log_stats(self) -> None:
+        if self.stats_interval is None:
+            return
+        now = time.monotonic()
+        if now - self._stats_logged_at >= self.stats_interval:
+            self._stats_logged_at = now
+            logger.info(f"BoundedMemoryBackend stats {self.stats()}")
+
+    def _lookup(self, key) -> MemoryEntry | None:
+        if self.sketch:
+            self.sketch.increment(key)
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at is not None and entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self._counters["expirations"] += 1
+            return None
+        self._cache.move_to_end(key)
+        return entry
+
+    def _remove(self, key) -> MemoryEntry | None:
+        if (entry := self._cache.pop(key, None)) is not None:
+            self._bytes -= entry.size
+        return entry
+
+    def _purge_expired(self) -> None:
+        now = time.monotonic()
+        for key in [
+            k
+            for k, e in self._cache.items()
+            if e.expires_at is not None and e.expires_at <= now
+        ]:
+            self._remove(key)
+            self._counters["expirations"] += 1
+
+    def _over_budget(self, extra_bytes: int = 0, extra_entries: int = 0) -> bool:
+        if self._bytes + extra_bytes > self.max_bytes:
+            return True
+        if self.max_entries is not None:
+            return len(self._cache) + extra_entries > self.max_entries
+        return False
+
+    def _admit(self, key, size: int) -> bool:
+        if size > self.max_bytes:
+            return False
+        if self._over_budget(size, 1):
+            self._purge_expired()
+        while self._cache and self._over_budget(size, 1):
+            victim = next(iter(self._cache))
+            if self.sketch and self.sketch.frequency(key) < self.sketch.frequency(
+                victim
+            ):
+                return False
+            self._remove(victim)
+            self._counters["evictions"] += 1
+        return True
+
+    def _store(self, key, value, ttl=None) -> bool:
+        self._remove(key)
+        size = estimate_size(value)
+        if not self._admit(key, size):
+            self._counters["rejections"] += 1
+            self._log_stats()
+            return False
+        self._cache[key] = MemoryEntry(
+            value=value,
+            size=size,
+            expires_at=time.monotonic() + ttl if ttl else None,
+        )
+        self._bytes += size
+        self._log_stats()
+        return True
+
+    async def _get(self, key, encoding="utf-8", _conn=None):
+        entry = self._lookup(key)
+        self._counters["hits" if entry else "misses"] += 1
+        self._log_stats()
+        return entry.value if entry else None
+
+    async def _gets(self, key, encoding="utf-8", _conn=None):
+        return await self._get(key, encoding=encoding, _conn=_conn)
+
+    async def _multi_get(self, keys, encoding="utf-8", _conn=None):
+        return [await self._get(key, encoding=encoding) for key in keys]
+
+    async def _set(self, key, value, ttl=None, _cas_token=None, _conn=None):
+        if _cas_token is not None:
+            entry = self._lookup(key)
+            if _cas_token != (entry.value if entry else None):
+                return 0
+        return self._store(key, value, ttl=ttl)
+
+    async def _multi_set(self, pairs, ttl=None, _conn=None):
+        for key, value in pairs:
+            self._store(key, value, ttl=ttl)
+        return True
+
+    async def _add(self, key, value, ttl=None, _conn=None):
+        if self._lookup(key):
+            raise ValueError(
+                "Key {} already exists, use .set to update the value".format(key)
+            )
+        self._store(key, value, ttl=ttl)
+        return True
+
+    async def _exists(self, key, _conn=None):
+        return self._lookup(key) is not None
+
+    async def _increment(self, key, delta, _conn=None):
+        if entry := self._lookup(key):
+            try:
+                value = int(entry.value) + delta
+            except ValueError:
+                raise TypeError("Value is not an integer") from None
+            entry.value = value
+            return value
+        self._store(key, delta)
+        return delta
+
+    async def _expire(self, key, ttl, _conn=None):
+        if entry := self._lookup(key):
+            entry.expires_at = time.monotonic() + ttl if ttl else None
+            return True
+        return False
+
+    async def _delete(self, key, _conn=None):
+        return 1 if self._remove(key) is not None else 0
+
+    async def _clear(self, namespace=None, _conn=None):
+        if namespace:
+            for key in [k for k in self._cache if k.startswith(namespace)]:
+                self._remove(key)
+        else:
+            self._cache.clear()
+            self._bytes = 0
+        return True
+
+    async def _raw(self, command, *args, encoding="utf-8", _conn=None, **kwargs):
+        return getattr(self._cache, command)(*args, **kwargs)
+
+    async def _redlock_release(self, key, value):
+        if (entry := self._lookup(key)) and entry.value == value:
+            self._remove(key)
+            return 1
+        return 0
+
+
+class BoundedMemoryCache(BoundedMemoryBackend):
+    NAME = "bounded-memory"
+
+    def __init__(self, serializer=None, **kwargs):
+        super().__init__(serializer=serializer or NullSerializer(), **kwargs)
+
+    @classmethod
+    def parse_uri_path(cls, path):
+        return {}
+
+
+class SqliteBackend(BaseCache):
+    def __init__(
+        self,
+        path: str,
+        vacuum_interval: float | None = 600,
+        busy_timeout: float = 5,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.path = path
+        self.vacuum_interval = vacuum_interval
+        self.busy_timeout = busy_timeout
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="sqlite-cache"
+        )
+        self._conn: sqlite3.Connection | None = None
+        self._vacuum_task: asyncio.Task | None = None
+
+    def stats(self) -> dict[str, int]:
+        stats = {}
+        for name, suffix in (("file_bytes", ""), ("wal_bytes", "-wal")):
+            with contextlib.suppress(OSError):
+                stats[name] = os.path.getsize(f"{self.path}{suffix}")
+        return stats
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(
+                self.path,
+                timeout=self.busy_timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache "
+                "(key TEXT PRIMARY KEY, value BLOB, expires_at REAL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)"
+            )
+            self._conn = conn
+            logger.debug(f"SqliteBackend initialized {self.path}")
+        return self._conn
+
+    async def _run(self, fn, *args):
+        if self.vacuum_interval and self._vacuum_task is None:
+            self._vacuum_task = asyncio.create_task(self._vacuum_periodically())
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def _vacuum_periodically(self):
+        while True:
+            await asyncio.sleep(self.vacuum_interval)
+            try:
+                removed = await self._run(self._vacuum_sync)
+                logger.debug(f"SqliteBackend vacuum removed {removed} entries")
+            except sqlite3.Error:
+                logger.exception("SqliteBackend vacuum failed")
+
+    def _vacuum_sync(self) -> int:
+        conn = self._connect()
+        removed = conn.execute(
+            "DELETE FROM cache WHERE expires_at <= ?", (time.time(),)
+        ).rowcount
+        conn.execute("PRAGMA incremental_vacuum")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return removed
+
+    @staticmethod
+    def _expires_at(ttl) -> float | None:
+        return time.time() + ttl if ttl else None
+
+    def _get_sync(self, key):
+        row = (
+            self._connect()
+            .execute(
+                "SELECT value FROM cache WHERE key = ? "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time()),
+            )
+            .fetchone()
+        )
+        return row[0] if row else None
+
+    def _set_sync(self, pairs, ttl=None, _cas_token=None):
+        conn = self._connect()
+        expires_at = self._expires_at(ttl)
+        if _cas_token is not None:
+            key, value = pairs[0]
+            return conn.execute(
+                "UPDATE cache SET value = ?, expires_at = ? "
+                "WHERE key = ? AND value = ?",
+                (value, expires_at, key, _cas_token),
+            ).rowcount
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) "
+                "VALUES (?, ?, ?)",
+                [(key, value, expires_at) for key, value in pairs],
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return True
+
+    def _add_sync(self, key, value, ttl=None):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM cache WHERE key = ? AND expires_at <= ?",
+                (key, time.time()),
+            )
+            conn.execute(
+                "INSERT INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, self._expires_at(ttl)),
+            )
+        except sqlite3.IntegrityError:
+            conn.execute("ROLLBACK")
+            raise ValueError(
+                "Key {} already exists, use .set to update the value".format(key)
+            ) from None
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return True
+
+    def _increment_sync(self, key, delta):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value FROM cache WHERE key = ? "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time()),
+            ).fetchone()
+            try:
+                value = int(row[0]) + delta if row else delta
+            except (TypeError, ValueError):
+                raise TypeError("Value is not an integer") from None
+            conn.execute(
+                "INSERT INTO cache (key, value, expires_at) VALUES (?, ?, NULL) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (key, value),
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return value
+
+    def _expire_sync(self, key, ttl):
+        return bool(
+            self._connect()
+            .execute(
+                "UPDATE cache SET expires_at = ? WHERE key = ? "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (self._expires_at(ttl), key, time.time()),
+            )
+            .rowcount
+        )
+
+    def _delete_sync(self, key):
+        return (
+            self._connect().execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount
+        )
+
+    def _clear_sync(self, namespace=None):
+        if namespace:
+            self._connect().execute(
+                "DELETE FROM cache WHERE substr(key, 1, ?) = ?",
+                (len(namespace), namespace),
+            )
+        else:
+            self._connect().execute("DELETE FROM cache")
+        return True
+
+    async def _get(self, key, encoding="utf-8", _conn=None):
+        return await self._run(self._get_sync, key)
+
+    async def _gets(self, key, encoding="utf-8", _conn=None):
+        return await self._get(key, encoding=encoding, _conn=_conn)
+
+    async def _multi_get(self, keys, encoding="utf-8", _conn=None):
+        return [await self._run(self._get_sync, key) for key in keys]
+
+    async def _set(self, key, value, ttl=None, _cas_token=None, _conn=None):
+        return await self._run(self._set_sync, [(key, value)], ttl, _cas_token)
+
+    async def _multi_set(self, pairs, ttl=None, _conn=None):
+        return await self._run(self._set_sync, list(pairs), ttl)
+
+    async def _add(self, key, value, ttl=None, _conn=None):
+        return await self._run(self._add_sync, key, value, ttl)
+
+    async def _exists(self, key, _conn=None):
+        return await self._run(self._get_sync, key) is not None
+
+    async def _increment(self, key, delta, _conn=None):
+        return await self._run(self._increment_sync, key, delta)
+
+    async def _expire(self, key, ttl, _conn=None):
+        return await self._run(self._expire_sync, key, ttl)
+
+    async def _delete(self, key, _conn=None):
+        return await self._run(self._delete_sync, key)
+
+    async def _clear(self, namespace=None, _conn=None):
+        return await self._run(self._clear_sync, namespace)
+
+    async def _close(self, *args, _conn=None, **kwargs):
+        if self._vacuum_task:
+            self._vacuum_task.cancel()
+            self._vacuum_task = None
+        if self._conn:
+            conn, self._conn = self._conn, None
+            await asyncio.get_running_loop().run_in_executor(self._executor, conn.close)
+
+
+class SqliteCache(SqliteBackend):
+    NAME = "sqlite"
+
+    def __init__(self, serializer=None, **kwargs):
+        super().__init__(serializer=serializer or CompactSerializer(), **kwargs)
+
+    @classmethod
+    def parse_uri_path(cls, path):
+        return {"path": path}
+
+
+@dataclasses.dataclass
+class RefreshEntry:
+    value: Any
+    refresh_at: float
+    delta: float
+    expires_at: float | None = None
+
+
+class cached_with_refresh(cached):
+    def __init__(
+        self,
+        ttl: float,
+        stale_ttl: float | None = None,
+        beta=1.0,
+        service: Callable[..., str] | None = None,
+        **kwargs,
+    ):
+        super().__init__(
+            ttl=ttl + (stale_ttl if stale_ttl is not None else ttl), **kwargs
+        )
+        self.fresh_ttl = ttl
+        # Labels the cache timings, e.g. with the service id of a method's owner.
+        self.service = service
+        self.beta = beta
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    def __call__(self, f):
+        # Resolve the cache on first use so importing a service module doesn't
+        # pin the cache configuration that was active at import time.
+        resolve = super().__call__
+
+        @functools.wraps(f)
+        async def wrapper(*args, **kwargs):
+            if self.cache is None:
+                resolve(f)
+            return await self.decorator(f, *args, **kwargs)
+
+        return wrapper
+
+    async def decorator(self, f, *args, cache_read=True, cache_write=True, **kwargs):
+        kwargs.pop("aiocache_wait_for_write", None)
+        if not cache_write:
+            return await f(*args, **kwargs)
+
+        key = self.get_cache_key(f, args, kwargs)
+        service = self.service(*args) if self.service else self.alias or "memory"
+        if cache_read:
+            with timed(service, "cache_get"):
+                entry = await self.get_from_cache(key)
+            record_cache(isinstance(entry, RefreshEntry))
+            if isinstance(entry, RefreshEntry):
+                if self.should_refresh(entry):
+                    logger.debug(f"early refresh {key}")
+                    self._refresh(key, f, args, kwargs, service)
+                return entry.value
+
+        return await asyncio.shield(self._refresh(key, f, args, kwargs, service))
+
+    def should_refresh(self, entry: RefreshEntry) -> bool:
+        jitter = -entry.delta * self.beta * math.log(1.0 - random.random())
+        return time.time() + jitter >= entry.refresh_at
+
+    def _refresh(self, key, f, args, kwargs, service: str) -> asyncio.Task:
+        if task := self._inflight.get(key):
+            return task
+
+        task = asyncio.create_task(self._compute(key, f, args, kwargs, service))
+        self._inflight[key] = task
+
+        def done(task: asyncio.Task) -> None:
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+            if not task.cancelled() and (exc := task.exception()):
+                logger.warning(f"Couldn't refresh {key}", exc_info=exc)
+
+        task.add_done_callback(done)
+        return task
+
+    async def _compute(self, key, f, args, kwargs, service: str):
+        started_at = time.monotonic()
+        result = await f(*args, **kwargs)
+        if not self.skip_cache_func(result):
+            entry = RefreshEntry(
+                value=result,
+                refresh_at=time.time() + self.fresh_ttl,
+                delta=time.monotonic() - started_at,
+                expires_at=time.time() + self.ttl if self.ttl else None,
+            )
+            with timed(service, "cache_set"):
+                await self.set_in_cache(key, entry)
+        return result
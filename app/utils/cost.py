@@ -0,0 +1,116 @@
+import contextlib
+import contextvars
+import dataclasses
+import json
+import logging
+import time
+from typing import TYPE_CHECKING, Iterator
+
+if TYPE_CHECKING:
+    from aiohttp import TraceConfig
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class RequestCost:
+    upstream_requests: int = 0
+    upstream_bytes: int = 0
+    parse_cpu: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    service_seconds: dict[str, float] = dataclasses.field(default_factory=dict)
+    started_at: float = dataclasses.field(default_factory=time.monotonic)
+
+    @property
+    def wall(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def as_dict(self) -> dict:
+        return {
+            "upstream_requests": self.upstream_requests,
+            "upstream_bytes": self.upstream_bytes,
+            "parse_cpu_ms": round(self.parse_cpu * 1000, 1),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "wall_ms": round(self.wall * 1000, 1),
+            "service_ms": {
+                name: round(seconds * 1000, 1)
+                for name, seconds in self.service_seconds.items()
+            },
+        }
+
+    def metadata(self) -> tuple[tuple[str, str], ...]:
+        cost = self.as_dict()
+        services = ",".join(f"{k}={v}" for k, v in cost.pop("service_ms").items())
+        return (
+            *((f"x-cost-{k.replace('_', '-')}", str(v)) for k, v in cost.items()),
+            ("x-cost-service-ms", services),
+        )
+
+
+current_cost: contextvars.ContextVar[RequestCost | None] = contextvars.ContextVar(
+    "current_cost", default=None
+)
+
+
+def record_cache(hit: bool) -> None:
+    if cost := current_cost.get():
+        if hit:
+            cost.cache_hits += 1
+        else:
+            cost.cache_misses += 1
+
+
+def record_service_time(name: str, seconds: float) -> None:
+    if cost := current_cost.get():
+        cost.service_seconds[name] = cost.service_seconds.get(name, 0.0) + seconds
+
+
+@contextlib.contextmanager
+def parse_cpu() -> Iterator[None]:
+    if (cost := current_cost.get()) is None:
+        yield
+        return
+    started_at = time.thread_time()
+    try:
+        yield
+    finally:
+        cost.parse_cpu += time.thread_time() - started_at
+
+
+async def _on_request_start(session, ctx, params) -> None:
+    if cost := current_cost.get():
+        cost.upstream_requests += 1
+
+
+async def _on_response_chunk_received(session, ctx, params) -> None:
+    if cost := current_cost.get():
+        cost.upstream_bytes += len(params.chunk)
+
+
+def trace_config() -> "TraceConfig":
+    from aiohttp import TraceConfig
+
+    config = TraceConfig()
+    config.on_request_start.append(_on_request_start)
+    config.on_response_chunk_received.append(_on_response_chunk_received)
+    return config
+
+
+@contextlib.contextmanager
+def accounting(method: str, context, **fields) -> Iterator[RequestCost]:
+    cost = RequestCost()
+    current_cost.set(cost)
+    try:
+        yield cost
+    finally:
+        if context is not None:
+            context.set_trailing_metadata(cost.metadata())
+        logger.info(
+            json.dumps(
+                {"event": "request_cost", "method": method, **fields, **cost.as_dict()},
+                ensure_ascii=False,
+            )
+        )
@@ -0,0 +1,73 @@
+import datetime
+import functools
+import json
+import logging
+import os
+import pathlib
+
+from app.core import Coordinate, Library
+
+
+logger = logging.getLogger(__name__)
+
+
+GAZETTEER_VERSION = 1
+DEFAULT_GAZETTEER_PATH = (
+    pathlib.Path(__file__).parent.parent / "data" / "gazetteer.json"
+)
+
+
+class Gazetteer:
+    def __init__(self, coordinates: dict[str, Coordinate] | None = None) -> None:
+        self.coordinates = coordinates or {}
+
+    def __contains__(self, library_id: str) -> bool:
+        return library_id in self.coordinates
+
+    def __len__(self) -> int:
+        return len(self.coordinates)
+
+    def get(self, library_id: str) -> Coordinate | None:
+        return self.coordinates.get(library_id)
+
+    @classmethod
+    def from_libraries(cls, libraries: list[Library]) -> "Gazetteer":
+        return cls({lib.id: lib.coordinate for lib in libraries if lib.coordinate})
+
+    @classmethod
+    def load(cls, path: pathlib.Path) -> "Gazetteer":
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            logger.warning(f"Gazetteer {path} does not exist")
+            return cls()
+        if (version := data.get("version")) != GAZETTEER_VERSION:
+            logger.warning(f"Ignoring gazetteer {path} with {version=}")
+            return cls()
+        return cls(
+            {
+                library_id: Coordinate(latitude=latitude, longitude=longitude)
+                for library_id, (latitude, longitude) in data["libraries"].items()
+            }
+        )
+
+    def dump(self, path: pathlib.Path) -> None:
+        data = {
+            "version": GAZETTEER_VERSION,
+            "generated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "libraries": {
+                library_id: [coordinate.latitude, coordinate.longitude]
+                for library_id, coordinate in sorted(self.coordinates.items())
+            },
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+
+    @staticmethod
+    @functools.cache
+    def default() -> "Gazetteer":
+        return Gazetteer.load(
+            pathlib.Path(os.environ.get("GAZETTEER_PATH") or DEFAULT_GAZETTEER_PATH)
+        )
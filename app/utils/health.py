@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import os
+from typing import TYPE_CHECKING, Iterable
+
+from grpc_health.v1.health import aio as health_aio
+from grpc_health.v1.health_pb2 import HealthCheckResponse
+from heekkr.resolver_pb2 import DESCRIPTOR as RESOLVER_DESCRIPTOR
+
+if TYPE_CHECKING:
+    from app.resolver import Resolver
+
+
+logger = logging.getLogger(__name__)
+
+
+HEALTH_INTERVAL = float(os.environ.get("HEALTH_INTERVAL", 1))
+HEALTH_MAX_LOOP_LAG = float(os.environ.get("HEALTH_MAX_LOOP_LAG", 0.5))
+HEALTH_MAX_INFLIGHT_SEARCHES = int(os.environ.get("HEALTH_MAX_INFLIGHT_SEARCHES", 64))
+HEALTH_MIN_SUCCESS_RATE = float(os.environ.get("HEALTH_MIN_SUCCESS_RATE", 0.5))
+HEALTH_MAX_UPSTREAM_LATENCY = float(os.environ.get("HEALTH_MAX_UPSTREAM_LATENCY", 10))
+HEALTH_MIN_SAMPLES = int(os.environ.get("HEALTH_MIN_SAMPLES", 5))
+
+RESOLVER_SERVICE = RESOLVER_DESCRIPTOR.services_by_name["Resolver"].full_name
+
+SERVING = HealthCheckResponse.SERVING
+NOT_SERVING = HealthCheckResponse.NOT_SERVING
+
+
+class HealthReporter:
+    def __init__(
+        self,
+        resolver: "Resolver",
+        service_names: Iterable[str],
+        max_loop_lag: float = HEALTH_MAX_LOOP_LAG,
+        max_inflight_searches: int = HEALTH_MAX_INFLIGHT_SEARCHES,
+        min_success_rate: float = HEALTH_MIN_SUCCESS_RATE,
+        max_upstream_latency: float = HEALTH_MAX_UPSTREAM_LATENCY,
+        min_samples: int = HEALTH_MIN_SAMPLES,
+        interval: float = HEALTH_INTERVAL,
+    ) -> None:
+        self.servicer = health_aio.HealthServicer()
+        self.resolver = resolver
+        self.service_names = list(service_names)
+        self.max_loop_lag = max_loop_lag
+        self.max_inflight_searches = max_inflight_searches
+        self.min_success_rate = min_success_rate
+        self.max_upstream_latency = max_upstream_latency
+        self.min_samples = min_samples
+        self.interval = interval
+        self.ready = False
+        self.reason: str | None = None
+        self.statuses: dict[str, int] = {}
+        self._task: asyncio.Task | None = None
+
+    def overload_reason(self) -> str | None:
+        if (lag := self.resolver.loop_lag.lag) > self.max_loop_lag:
+            return f"event loop lag {lag:.3f}s"
+        if (inflight := self.resolver.inflight_searches) >= self.max_inflight_searches:
+            return f"{inflight} searches in flight"
+        return None
+
+    def upstream_status(self, name: str) -> int:
+        summary = self.resolver.upstreams.get(name).summary()
+        if summary.count < self.min_samples:
+            return SERVING
+        if summary.success_rate < self.min_success_rate:
+            return NOT_SERVING
+        if summary.p90_latency > self.max_upstream_latency:
+            return NOT_SERVING
+        return SERVING
+
+    def compute(self) -> dict[str, int]:
+        self.reason = "warming up" if not self.ready else self.overload_reason()
+        overall = NOT_SERVING if self.reason else SERVING
+        return {
+            "": overall,
+            RESOLVER_SERVICE: overall,
+            **{name: self.upstream_status(name) for name in self.service_names},
+        }
+
+    async def update(self) -> None:
+        for service, status in self.compute().items():
+            if self.statuses.get(service) != status:
+                name = HealthCheckResponse.ServingStatus.Name(status)
+                logger.info(
+                    f"Health of {service or 'server'!r} is now {name}"
+                    + (f" ({self.reason})" if not service and self.reason else "")
+                )
+                self.statuses[service] = status
+                await self.servicer.set(service, status)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.update()
+            except Exception:
+                logger.warning("Couldn't update health", exc_info=True)
+            await asyncio.sleep(self.interval)
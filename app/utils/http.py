@@ -0,0 +1,53 @@
+import asyncio
+import os
+import weakref
+
+from aiohttp import ClientSession, TCPConnector
+
+from app.utils.cost import trace_config
+
+
+HTTP_KEEPALIVE = float(os.environ.get("HTTP_KEEPALIVE", 30))
+# "https://original/=http://replacement,..." points services at another origin,
+# e.g. the fake upstream of the load test harness.
+UPSTREAM_OVERRIDES = dict(
+    override.split("=", 1)
+    for override in os.environ.get("UPSTREAM_OVERRIDES", "").split(",")
+    if override
+)
+
+_sessions: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[str, ClientSession]
+] = weakref.WeakKeyDictionary()
+
+
+def get_session(base_url: str) -> ClientSession:
+    sessions = _sessions.setdefault(asyncio.get_running_loop(), {})
+    session = sessions.get(base_url)
+    if session is None or session.closed:
+        session = sessions[base_url] = ClientSession(
+            UPSTREAM_OVERRIDES.get(base_url, base_url),
+            connector=TCPConnector(keepalive_timeout=HTTP_KEEPALIVE),
+            trace_configs=[trace_config()],
+        )
+    return session
+
+
+async def close_sessions() -> None:
+    sessions = _sessions.pop(asyncio.get_running_loop(), {})
+    for session in sessions.values():
+        await session.close()
+
+
+def session_stats() -> dict[str, dict[str, int]]:
+    sessions = _sessions.get(asyncio.get_running_loop(), {})
+    stats = {}
+    for base_url, session in list(sessions.items()):
+        connector = session.connector
+        stats[base_url] = {
+            "in_use": len(getattr(connector, "_acquired", ())),
+            "idle": sum(
+                len(conns) for conns in getattr(connector, "_conns", {}).values()
+            ),
+        }
+    return stats
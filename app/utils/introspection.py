@@ -0,0 +1,141 @@
+import dataclasses
+import functools
+import itertools
+import json
+import time
+from typing import TYPE_CHECKING, AsyncIterable, Iterable, TypeVar
+
+from aiocache import caches
+
+from app.utils.http import session_stats
+from app.utils import memory
+from app.utils.kakao import Kakao
+from app.utils.scheduling import scheduler_stats
+
+if TYPE_CHECKING:
+    from app.resolver import Resolver
+
+
+T = TypeVar("T")
+
+
+@dataclasses.dataclass
+class InflightSearch:
+    term: str
+    client: str
+    services: dict[str, str]
+    started_at: float = dataclasses.field(default_factory=time.monotonic)
+    stage: str = "admission"
+    entities: int = 0
+
+    async def follow(self, name: str, iterable: AsyncIterable[T]) -> AsyncIterable[T]:
+        try:
+            async for item in iterable:
+                self.services[name] = "streaming"
+                self.entities += 1
+                yield item
+        except Exception:
+            self.services[name] = "failed"
+            raise
+        self.services[name] = "done"
+
+    def describe(self, now: float) -> dict:
+        return {
+            "term": self.term,
+            "client": self.client,
+            "age": now - self.started_at,
+            "stage": self.stage,
+            "entities": self.entities,
+            "services": dict(self.services),
+        }
+
+
+class InflightSearches:
+    # Only ever touched from the event loop thread, so plain dict updates are
+    # enough and readers never block a search.
+    def __init__(self) -> None:
+        self.searches: dict[int, InflightSearch] = {}
+        self._ids = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.searches)
+
+    def register(self, term: str, client: str, services: Iterable[str]):
+        search_id = next(self._ids)
+        search = self.searches[search_id] = InflightSearch(
+            term=term, client=client, services={name: "pending" for name in services}
+        )
+        return search_id, search
+
+    def unregister(self, search_id: int) -> None:
+        self.searches.pop(search_id, None)
+
+    def describe(self) -> list[dict]:
+        now = time.monotonic()
+        return sorted(
+            (search.describe(now) for search in list(self.searches.values())),
+            key=lambda search: -search["age"],
+        )
+
+
+def cache_stats() -> dict:
+    stats = {}
+    for alias in caches.get_config():
+        cache = caches.get(alias)
+        stats[alias] = {
+            "backend": type(cache).__name__,
+            **(cache.stats() if hasattr(cache, "stats") else {}),
+        }
+    return stats
+
+
+def state(resolver: "Resolver") -> dict:
+    index = resolver.library_index
+    schedulers, sessions = scheduler_stats(), session_stats()
+    slow_callbacks = resolver.loop_lag.slow_callbacks
+    return {
+        "searches": resolver.searches.describe(),
+        "admission": resolver.admission.stats(),
+        "loop_lag": resolver.loop_lag.lag,
+        "loop_lag_smoothed": resolver.loop_lag.smoothed,
+        "slow_callbacks": [
+            dataclasses.asdict(record)
+            for record in list(slow_callbacks.records if slow_callbacks else ())[-10:]
+        ],
+        "upstreams": {
+            url: {**schedulers.get(url, {}), **sessions.get(url, {})}
+            for url in sorted(schedulers.keys() | sessions.keys())
+        },
+        "caches": cache_stats(),
+        "libraries": {
+            "fingerprint": index.fingerprint,
+            "size": len(index.index),
+            "updated_at": index.updated_at,
+            "services": dict(resolver.library_tables),
+        },
+        "kakao": Kakao.shared().stats(),
+        "memory": memory.stats(),
+    }
+
+
+def state_handler(resolver: "Resolver"):
+    from aiohttp import web
+
+    dumps = functools.partial(json.dumps, ensure_ascii=False, default=str)
+
+    async def handle(request: web.Request) -> web.Response:
+        return web.json_response(state(resolver), dumps=dumps)
+
+    return handle
+
+
+def memory_handler():
+    from aiohttp import web
+
+    async def handle(request: web.Request) -> web.Response:
+        limit = int(request.query.get("limit", memory.MEMORY_PROFILE_TOP))
+        return web.json_response(
+            {"memory": memory.stats(), "top": memory.top_allocations(limit)}
+        )
+
+    return handle
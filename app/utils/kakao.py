@@ -1,10 +1,23 @@
+import asyncio
+import collections
 import dataclasses
 import contextlib
+import datetime
 import logging
 import os
+import weakref
+from typing import Awaitable, Callable, Iterable
+from zoneinfo import ZoneInfo
 
-from aiocache import cached
-from aiohttp import ClientSession
+from aiocache import caches
+from aiocache.backends.memory import SimpleMemoryBackend
+from aiohttp import ClientError, ClientSession, ClientTimeout, TCPConnector
+
+from app.utils.cache import BoundedMemoryBackend
+from app.utils.cost import record_cache, trace_config
+from app.utils.metrics import timed
+from app.utils.ratelimit import TokenBucket
+from app.utils.tracing import span
 
 
 logger = logging.getLogger(__name__)
@@ -16,38 +29,246 @@ class Address:
     y: float
 
 
-class Kakao(contextlib.AsyncContextDecorator):
-    def __init__(self) -> None:
-        key = os.environ.get("KAKAO_API_KEY")
+@dataclasses.dataclass
+class GeocodeMiss:
+    pass
+
+
+@dataclasses.dataclass
+class GeocodeError:
+    reason: str
+
+
+class KakaoError(Exception):
+    pass
+
+
+class QuotaExhausted(KakaoError):
+    pass
+
+
+KAKAO_CONCURRENCY = int(os.environ.get("KAKAO_CONCURRENCY", 8))
+KAKAO_RATE = float(os.environ.get("KAKAO_RATE", 20))
+KAKAO_TIMEOUT = float(os.environ.get("KAKAO_TIMEOUT", 3))
+KAKAO_DAILY_QUOTA = int(os.environ.get("KAKAO_DAILY_QUOTA", 100_000))
+KAKAO_QUOTA_RESERVE = float(os.environ.get("KAKAO_QUOTA_RESERVE", 0.1))
+KAKAO_HIT_TTL = int(os.environ.get("KAKAO_HIT_TTL", 60 * 60 * 24 * 30))
+KAKAO_MISS_TTL = int(os.environ.get("KAKAO_MISS_TTL", 60 * 60 * 24 * 7))
+KAKAO_ERROR_TTL = int(os.environ.get("KAKAO_ERROR_TTL", 60 * 5))
+
+KST = ZoneInfo("Asia/Seoul")
+
 
-        self.session = (
-            ClientSession(headers={"Authorization": f"KakaoAK {key}"}) if key else None
+@dataclasses.dataclass
+class _LoopState:
+    semaphore: asyncio.Semaphore
+    inflight: dict[str, asyncio.Future]
+    client: "Kakao | None" = None
+
+
+_loop_states: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, _LoopState
+] = weakref.WeakKeyDictionary()
+
+
+def _loop_state() -> _LoopState:
+    loop = asyncio.get_running_loop()
+    if (state := _loop_states.get(loop)) is None:
+        state = _loop_states[loop] = _LoopState(
+            semaphore=asyncio.Semaphore(KAKAO_CONCURRENCY), inflight={}
         )
+    return state
 
-    @cached(ttl=60 * 60 * 24 * 30, alias="default")
-    async def search_address(self, query: str) -> Address | None:
-        if not self.session:
+
+class DailyQuota:
+    def __init__(self, limit: int, reserve: float = 0.0, alias: str = "default"):
+        self.limit = limit
+        self.reserve = reserve
+        self.alias = alias
+        self.used = 0
+        self.day: str | None = None
+        self._checked_backend = False
+
+    @property
+    def budget(self) -> int:
+        return int(self.limit * (1 - self.reserve))
+
+    @property
+    def exhausted(self) -> bool:
+        # Only for the day that was counted, so a new day goes back to the counter.
+        return bool(self.limit) and self.used >= self.budget and self.day == self._key()
+
+    def _key(self) -> str:
+        return f"kakao:quota:{datetime.datetime.now(KST).date().isoformat()}"
+
+    async def acquire(self) -> bool:
+        if not self.limit:
+            return True
+        cache = caches.get(self.alias)
+        if not self._checked_backend:
+            self._checked_backend = True
+            if isinstance(cache, (BoundedMemoryBackend, SimpleMemoryBackend)):
+                logger.warning(
+                    "Kakao daily quota is counted in memory and resets on restart; "
+                    "set SQLITE_CACHE_PATH or GCS_CACHE_BUCKET to keep it"
+                )
+        if (key := self._key()) != self.day:
+            self.day, self.used = key, 0
+        try:
+            self.used = await cache.increment(key)
+            if self.used == 1:
+                await cache.expire(key, 60 * 60 * 48)
+        except Exception:
+            logger.exception("Couldn't update Kakao quota counter")
+            self.used += 1
+        return self.used <= self.budget
+
+
+class Kakao(contextlib.AsyncContextDecorator):
+    def __init__(
+        self,
+        key: str | None = None,
+        rate: float | None = KAKAO_RATE,
+        timeout: float = KAKAO_TIMEOUT,
+        daily_quota: int = KAKAO_DAILY_QUOTA,
+        quota_reserve: float = KAKAO_QUOTA_RESERVE,
+        hit_ttl: int = KAKAO_HIT_TTL,
+        miss_ttl: int = KAKAO_MISS_TTL,
+        error_ttl: int = KAKAO_ERROR_TTL,
+        alias: str = "default",
+    ) -> None:
+        self.key = key or os.environ.get("KAKAO_API_KEY")
+        self.ttls = {"hit": hit_ttl, "miss": miss_ttl, "error": error_ttl}
+        self.alias = alias
+        self.timeout = timeout
+        self.limiter = TokenBucket(rate, burst=KAKAO_CONCURRENCY)
+        self.quota = DailyQuota(daily_quota, reserve=quota_reserve)
+        self.counters = collections.Counter()
+        self._session: ClientSession | None = None
+        self._shared = False
+
+    @classmethod
+    def shared(cls) -> "Kakao":
+        state = _loop_state()
+        if state.client is None:
+            state.client = cls()
+            state.client._shared = True
+        return state.client
+
+    @property
+    def session(self) -> ClientSession | None:
+        if not self.key:
             return None
+        if self._session is None or self._session.closed:
+            self._session = ClientSession(
+                headers={"Authorization": f"KakaoAK {self.key}"},
+                timeout=ClientTimeout(total=self.timeout),
+                connector=TCPConnector(limit=KAKAO_CONCURRENCY, keepalive_timeout=60),
+                trace_configs=[trace_config()],
+            )
+        return self._session
+
+    def stats(self) -> dict[str, int]:
+        return {
+            **self.counters,
+            "quota_used": self.quota.used,
+            "quota_budget": self.quota.budget,
+        }
+
+    async def _request(self, path: str, params: dict) -> dict:
+        if not (session := self.session):
+            raise KakaoError("KAKAO_API_KEY is not set")
+        if self.quota.exhausted or not await self.quota.acquire():
+            self.counters["quota_exhausted"] += 1
+            logger.warning(f"Kakao daily quota nearly exhausted {self.quota.used=}")
+            raise QuotaExhausted()
+        if await self.limiter.acquire():
+            self.counters["throttled"] += 1
+
+        self.counters["requests"] += 1
+        try:
+            async with _loop_state().semaphore, session.get(
+                f"https://dapi.kakao.com{path}", params=params
+            ) as response:
+                res = await response.json()
+                if response.status != 200:
+                    self.counters["errors"] += 1
+                    logger.error(
+                        f"Request failed with {response.status}",
+                        extra={"response": response, "body": res},
+                    )
+                    raise KakaoError(f"Request failed with {response.status}")
+                return res
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            logger.warning(f"Kakao request timed out {path} {params=}")
+            raise KakaoError("Request timed out") from None
+        except ClientError as e:
+            self.counters["errors"] += 1
+            logger.warning(f"Kakao request failed {path} {params=}", exc_info=True)
+            raise KakaoError(str(e)) from e
+
+    async def _lookup(
+        self,
+        kind: str,
+        query: str,
+        fetch: Callable[[str], Awaitable[Address | None]],
+    ) -> Address | None:
+        if not self.key:
+            return None
+
+        cache = caches.get(self.alias)
+        key = f"kakao:{kind}:{query}"
+        try:
+            with timed("kakao", "cache_get"):
+                entry = await cache.get(key)
+        except Exception:
+            logger.exception(f"Couldn't retrieve {key}, unexpected error")
+            entry = None
+        record_cache(entry is not None)
+        if entry is not None:
+            outcome = (
+                "hit"
+                if isinstance(entry, Address)
+                else "miss"
+                if isinstance(entry, GeocodeMiss)
+                else "error"
+            )
+            self.counters[f"cached_{outcome}"] += 1
+            return entry if outcome == "hit" else None
+
+        try:
+            with timed("kakao", kind), span("geocode", f"kakao {kind}"):
+                address = await fetch(query)
+        except QuotaExhausted:
+            return None
+        except KakaoError as e:
+            outcome, entry = "error", GeocodeError(reason=str(e))
+        else:
+            outcome, entry = ("hit", address) if address else ("miss", GeocodeMiss())
+
+        self.counters[outcome] += 1
+        try:
+            with timed("kakao", "cache_set"):
+                await cache.set(key, entry, ttl=self.ttls[outcome])
+        except Exception:
+            logger.exception(f"Couldn't set {key}, unexpected error")
+        return entry if outcome == "hit" else None
 
+    async def search_address(self, query: str) -> Address | None:
+        return await self._lookup("address", query, self._fetch_address)
+
+    async def _fetch_address(self, query: str) -> Address | None:
         logger.debug(f"search_address {query}")
-        async with self.session.get(
-            "https://dapi.kakao.com/v2/local/search/address.json",
-            params={
+        res = await self._request(
+            "/v2/local/search/address.json",
+            {
                 "query": query,
                 "analyze_type": "similar",
                 "page": 1,
                 "size": 1,
             },
-        ) as response:
-            res = await response.json()
-
-            if response.status != 200:
-                logger.error(
-                    f"Request failed with {response.status}",
-                    extra={"response": response, "body": res},
-                )
-                return
-
+        )
         if res["meta"]["total_count"] < 1:
             return
 
@@ -57,21 +278,18 @@ class Kakao(contextlib.AsyncContextDecorator):
             y=float(doc["y"]),
         )
 
-    @cached(ttl=60 * 60 * 24 * 30, alias="default")
     async def search_keyword(self, keyword: str) -> Address | None:
-        if not self.session:
-            return None
+        return await self._lookup("keyword", keyword, self._fetch_keyword)
 
+    async def _fetch_keyword(self, keyword: str) -> Address | None:
         logger.debug(f"search_keyword {keyword}")
-        async with self.session.get(
-            "https://dapi.kakao.com/v2/local/search/keyword.json",
-            params={
+        res = await self._request(
+            "/v2/local/search/keyword.json",
+            {
                 "query": keyword,
                 "size": 1,
             },
-        ) as response:
-            res = await response.json()
-
+        )
         if res["meta"]["total_count"] < 1:
             return
 
@@ -81,9 +299,28 @@ class Kakao(contextlib.AsyncContextDecorator):
             y=float(doc["y"]),
         )
 
+    async def search_keywords(self, keywords: Iterable[str]) -> list[Address | None]:
+        return await asyncio.gather(
+            *(self._search_keyword_shared(keyword) for keyword in keywords)
+        )
+
+    async def _search_keyword_shared(self, keyword: str) -> Address | None:
+        inflight = _loop_state().inflight
+        if (future := inflight.get(keyword)) is None:
+            future = inflight[keyword] = asyncio.ensure_future(
+                self.search_keyword(keyword)
+            )
+            future.add_done_callback(lambda _: inflight.pop(keyword, None))
+        return await asyncio.shield(future)
+
     async def __aenter__(self) -> "Kakao":
         return self
 
     async def __aexit__(self, *exc) -> None:
-        if self.session:
-            await self.session.close()
+        if not self._shared:
+            await self.close()
+
+    async def close(self) -> None:
+        if self._session:
+            await self._session.close()
+            self._session = None
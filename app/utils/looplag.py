@@ -0,0 +1,197 @@
+import asyncio
+import collections
+import contextlib
+import dataclasses
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+
+from app.utils import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+# Slow callback timing patches asyncio.Handle._run for the whole process and runs a
+# watchdog thread, so it is opt-in; the lag probe itself is a plain task.
+LOOP_MONITOR = os.environ.get("LOOP_MONITOR", "0").lower() not in ("0", "false", "")
+LOOP_LAG_INTERVAL = float(os.environ.get("LOOP_LAG_INTERVAL", 0.1))
+SLOW_CALLBACK_THRESHOLD = float(os.environ.get("SLOW_CALLBACK_THRESHOLD", 0.1))
+LOOP_LAG_SMOOTHING = float(os.environ.get("LOOP_LAG_SMOOTHING", 0.2))
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+loop_lag_seconds = metrics.registry.register(
+    metrics.Histogram(
+        "heekkr_loop_lag_seconds",
+        "Event-loop scheduling delay of a periodic probe.",
+        buckets=LAG_BUCKETS,
+    )
+)
+slow_callback_seconds = metrics.registry.register(
+    metrics.Histogram(
+        "heekkr_slow_callback_seconds",
+        "Callbacks that blocked the event loop longer than the threshold.",
+        buckets=LAG_BUCKETS,
+    )
+)
+
+
+@dataclasses.dataclass
+class SlowCallback:
+    at: float
+    duration: float
+    callback: str
+    stack: str | None
+
+
+def describe_handle(handle: asyncio.Handle) -> str:
+    task = getattr(handle._callback, "__self__", None)
+    if not isinstance(task, asyncio.Task):
+        return repr(handle)
+    coro = task.get_coro()
+    # Follow the await chain to where the task is suspended now.
+    frame = None
+    while coro is not None and (frame := getattr(coro, "cr_frame", None)):
+        coro = getattr(coro, "cr_await", None)
+    location = f" at {frame.f_code.co_filename}:{frame.f_lineno}" if frame else ""
+    name = getattr(task.get_coro(), "__qualname__", "?")
+    return f"{task.get_name()} ({name}){location}"
+
+
+class SlowCallbackMonitor:
+    def __init__(self, threshold: float, max_records: int = 100) -> None:
+        self.threshold = threshold
+        self.records: collections.deque[SlowCallback] = collections.deque(
+            maxlen=max_records
+        )
+        self._current: tuple[float, asyncio.Handle] | None = None
+        self._stack: str | None = None
+        self._original_run = None
+        self._thread_id: int | None = None
+        self._stopped = threading.Event()
+
+    def install(self) -> None:
+        if self._original_run is not None:
+            return
+        self._thread_id = threading.get_ident()
+        self._original_run = original_run = asyncio.Handle._run
+        monitor = self
+
+        def _run(handle: asyncio.Handle) -> None:
+            if threading.get_ident() != monitor._thread_id:
+                return original_run(handle)
+            started_at = time.perf_counter()
+            monitor._current = (started_at, handle)
+            monitor._stack = None
+            try:
+                return original_run(handle)
+            finally:
+                monitor._current = None
+                if (duration := time.perf_counter() - started_at) >= monitor.threshold:
+                    monitor._record(handle, duration)
+
+        asyncio.Handle._run = _run
+        self._stopped.clear()
+        threading.Thread(
+            target=self._watch, name="slow-callback-watchdog", daemon=True
+        ).start()
+
+    def uninstall(self) -> None:
+        if self._original_run is not None:
+            asyncio.Handle._run = self._original_run
+            self._original_run = None
+        self._stopped.set()
+
+    def _watch(self) -> None:
+        # Grabs the loop thread's stack while a callback is still blocking it,
+        # which is where the time actually goes.
+        while not self._stopped.wait(self.threshold / 2):
+            current = self._current
+            if current is None or self._stack is not None:
+                continue
+            if time.perf_counter() - current[0] < self.threshold:
+                continue
+            if frame := sys._current_frames().get(self._thread_id):
+                summary = traceback.extract_stack(frame)
+                # Drop the event loop's own frames above the callback.
+                for i, entry in enumerate(summary):
+                    if entry.filename == asyncio.events.__file__:
+                        summary = summary[i + 1 :]
+                stack = "".join(traceback.format_list(summary))
+                if self._current is current:
+                    self._stack = stack
+
+    def _record(self, handle: asyncio.Handle, duration: float) -> None:
+        record = SlowCallback(
+            at=time.time(),
+            duration=duration,
+            callback=describe_handle(handle),
+            stack=self._stack,
+        )
+        self.records.append(record)
+        if metrics.is_enabled():
+            slow_callback_seconds.observe(duration)
+        logger.warning(
+            f"Event loop blocked for {duration * 1000:.0f}ms by {record.callback}"
+            + (f"\n{record.stack.rstrip()}" if record.stack else "")
+        )
+
+
+class LoopLagMonitor:
+    def __init__(
+        self,
+        interval: float = LOOP_LAG_INTERVAL,
+        window: int = 50,
+        slow_callback_threshold: float | None = None,
+        smoothing: float = LOOP_LAG_SMOOTHING,
+    ) -> None:
+        if slow_callback_threshold is None:
+            slow_callback_threshold = SLOW_CALLBACK_THRESHOLD if LOOP_MONITOR else 0
+        self.interval = interval
+        self.smoothing = smoothing
+        self.samples: collections.deque[float] = collections.deque(maxlen=window)
+        # Moving average: a single long callback fades within a few samples, while
+        # the window maximum above keeps it for the whole window.
+        self.smoothed = 0.0
+        self.slow_callbacks = (
+            SlowCallbackMonitor(slow_callback_threshold)
+            if slow_callback_threshold > 0
+            else None
+        )
+        self._task: asyncio.Task | None = None
+
+    @property
+    def lag(self) -> float:
+        return max(self.samples, default=0.0)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            if self.slow_callbacks:
+                self.slow_callbacks.install()
+
+    async def stop(self) -> None:
+        if self.slow_callbacks:
+            self.slow_callbacks.uninstall()
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started_at = loop.time()
+            await asyncio.sleep(self.interval)
+            self.observe(max(0.0, loop.time() - started_at - self.interval))
+
+    def observe(self, lag: float) -> None:
+        self.samples.append(lag)
+        self.smoothed += self.smoothing * (lag - self.smoothed)
+        if metrics.is_enabled():
+            loop_lag_seconds.observe(lag)
@@ -0,0 +1,141 @@
+import contextlib
+import contextvars
+import dataclasses
+import json
+import logging
+import os
+import tracemalloc
+from typing import Iterator
+
+
+logger = logging.getLogger(__name__)
+
+
+MEMORY_PROFILE = os.environ.get("MEMORY_PROFILE", "0") not in ("", "0")
+MEMORY_PROFILE_FRAMES = int(os.environ.get("MEMORY_PROFILE_FRAMES", 1))
+MEMORY_PROFILE_TOP = int(os.environ.get("MEMORY_PROFILE_TOP", 10))
+
+
+@dataclasses.dataclass
+class StageMemory:
+    calls: int = 0
+    peak: int = 0
+    retained: int = 0
+
+
+@dataclasses.dataclass
+class MemoryProfile:
+    started: int
+    peak: int = 0
+    stages: dict[str, StageMemory] = dataclasses.field(default_factory=dict)
+
+    def as_dict(self, current: int) -> dict:
+        return {
+            "peak_kib": round(max(self.peak - self.started, 0) / 1024, 1),
+            "retained_kib": round((current - self.started) / 1024, 1),
+            "stages": {
+                name: {
+                    "calls": stage.calls,
+                    "peak_kib": round(stage.peak / 1024, 1),
+                    "retained_kib": round(stage.retained / 1024, 1),
+                }
+                for name, stage in self.stages.items()
+            },
+        }
+
+
+current_profile: contextvars.ContextVar[MemoryProfile | None] = contextvars.ContextVar(
+    "current_profile", default=None
+)
+
+
+def enable(frames: int = MEMORY_PROFILE_FRAMES) -> None:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def disable() -> None:
+    tracemalloc.stop()
+
+
+def is_enabled() -> bool:
+    return tracemalloc.is_tracing()
+
+
+def stats() -> dict | None:
+    if not tracemalloc.is_tracing():
+        return None
+    current, peak = tracemalloc.get_traced_memory()
+    return {"traced_kib": current // 1024, "peak_kib": peak // 1024}
+
+
+@contextlib.contextmanager
+def tracked(service: str, stage: str) -> Iterator[None]:
+    # Only wraps synchronous sections, so no other task can allocate in between
+    # and resetting the process-wide peak is safe.
+    if (profile := current_profile.get()) is None or not tracemalloc.is_tracing():
+        yield
+        return
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    try:
+        yield
+    finally:
+        after, peak = tracemalloc.get_traced_memory()
+        memory = profile.stages.setdefault(f"{service}.{stage}", StageMemory())
+        memory.calls += 1
+        memory.peak = max(memory.peak, peak - before)
+        memory.retained += after - before
+        profile.peak = max(profile.peak, peak)
+
+
+@contextlib.contextmanager
+def profiled(method: str, **fields) -> Iterator[MemoryProfile | None]:
+    if not tracemalloc.is_tracing():
+        yield None
+        return
+    current, _ = tracemalloc.get_traced_memory()
+    profile = MemoryProfile(started=current, peak=current)
+    current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        current, _ = tracemalloc.get_traced_memory()
+        logger.info(
+            json.dumps(
+                {
+                    "event": "memory_profile",
+                    "method": method,
+                    **fields,
+                    **profile.as_dict(current),
+                },
+                ensure_ascii=False,
+            )
+        )
+
+
+def top_allocations(limit: int = MEMORY_PROFILE_TOP) -> list[dict]:
+    if not tracemalloc.is_tracing():
+        return []
+    key = "traceback" if tracemalloc.get_traceback_limit() > 1 else "lineno"
+    statistics = tracemalloc.take_snapshot().statistics(key)
+    return [
+        {
+            "size_kib": round(stat.size / 1024, 1),
+            "count": stat.count,
+            "traceback": [
+                f"{frame.filename}:{frame.lineno}" for frame in stat.traceback
+            ],
+        }
+        for stat in statistics[:limit]
+    ]
+
+
+def log_top_allocations(limit: int = MEMORY_PROFILE_TOP) -> None:
+    current, peak = tracemalloc.get_traced_memory()
+    logger.info(f"Traced memory {current / 1024:.0f}KiB (peak {peak / 1024:.0f}KiB)")
+    for stat in top_allocations(limit):
+        logger.info(
+            f"{stat['size_kib']:10.1f}KiB {stat['count']:7d} blocks "
+            + " <- ".join(stat["traceback"])
+        )
@@ -0,0 +1,147 @@
+import bisect
+import contextlib
+import os
+import time
+from typing import ContextManager, Iterator
+
+
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 0))
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+_enabled = False
+_disabled = contextlib.nullcontext()
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels -> [bucket counts..., +Inf count, sum]
+        self.series: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        if (series := self.series.get(labels)) is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    @contextlib.contextmanager
+    def _time(self, labels: tuple[str, ...]) -> Iterator[None]:
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at, *labels)
+
+    def time(self, *labels: str) -> ContextManager[None]:
+        if not _enabled:
+            return _disabled
+        return self._time(labels)
+
+    def collect(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in sorted(self.series.items()):
+            pairs = tuple(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series[:-1]):
+                cumulative += count
+                le = _format_labels((*pairs, ("le", str(bound))))
+                yield f"{self.name}_bucket{le} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(pairs)} {series[-1]}"
+            yield f"{self.name}_count{_format_labels(pairs)} {cumulative}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: list[Histogram] = []
+
+    def register(self, metric: Histogram) -> Histogram:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "".join(
+            f"{line}\n" for metric in self.metrics for line in metric.collect()
+        )
+
+
+registry = Registry()
+
+stage_seconds = registry.register(
+    Histogram(
+        "heekkr_stage_seconds",
+        "Time spent in each stage of the search pipeline.",
+        ("service", "stage"),
+    )
+)
+
+
+def timed(service: str, stage: str) -> ContextManager[None]:
+    return stage_seconds.time(service, stage)
+
+
+async def start_metrics_server(port: int, host: str = "127.0.0.1", routes=()):
+    from aiohttp import web
+
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(
+            body=registry.render().encode(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    for path, handler in routes:
+        app.router.add_get(path, handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
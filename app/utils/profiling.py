@@ -0,0 +1,51 @@
+import collections
+import pathlib
+import sys
+import threading
+import types
+
+
+def frame_name(frame: types.FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    # Samples the stack of the thread that started it, e.g. the event loop, and
+    # counts identical stacks in the folded format read by flamegraph.pl and
+    # speedscope.
+    def __init__(self, interval: float = 0.001) -> None:
+        self.interval = interval
+        self.counts: collections.Counter[str] = collections.Counter()
+        self._thread_id: int | None = None
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def write_folded(self, path: pathlib.Path) -> None:
+        with path.open("w") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
@@ -0,0 +1,34 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    def __init__(self, rate: float | None, burst: int | None = None) -> None:
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate or 1))
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * (self.rate or 0)
+        )
+        self.updated_at = now
+
+    def try_acquire(self) -> bool:
+        if not self.rate:
+            return True
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    async def acquire(self) -> float:
+        waited = 0.0
+        while not self.try_acquire():
+            delay = (1 - self.tokens) / self.rate
+            await asyncio.sleep(delay)
+            waited += delay
+        return waited
@@ -0,0 +1,118 @@
+import asyncio
+import contextlib
+import contextvars
+import dataclasses
+import heapq
+import itertools
+import os
+import weakref
+from typing import AsyncIterator
+
+
+UPSTREAM_CONCURRENCY = int(os.environ.get("UPSTREAM_CONCURRENCY", 8))
+PRIORITY_WEIGHTS = {
+    "interactive": float(os.environ.get("UPSTREAM_WEIGHT_INTERACTIVE", 4)),
+    "bulk": float(os.environ.get("UPSTREAM_WEIGHT_BULK", 1)),
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class ClientInfo:
+    id: str
+    priority: str = "interactive"
+
+    @property
+    def weight(self) -> float:
+        return PRIORITY_WEIGHTS.get(self.priority, PRIORITY_WEIGHTS["interactive"])
+
+
+current_client: contextvars.ContextVar[ClientInfo] = contextvars.ContextVar(
+    "current_client", default=ClientInfo("anonymous")
+)
+
+
+def client_from_context(context) -> ClientInfo:
+    if context is None:
+        return current_client.get()
+    metadata = dict(context.invocation_metadata() or ())
+    client_id = metadata.get("x-client-id")
+    if not client_id and (peer := context.peer()):
+        # "ipv4:10.0.0.1:53211" -> "ipv4:10.0.0.1", one id per host not per connection
+        client_id = peer.rsplit(":", 1)[0]
+    priority = metadata.get("x-priority", "interactive")
+    if priority not in PRIORITY_WEIGHTS:
+        priority = "interactive"
+    return ClientInfo(client_id or "anonymous", priority)
+
+
+class FairScheduler:
+    # Weighted fair queueing: each request is tagged with a virtual finish time
+    # and the smallest tag is served first, so a client's share of the upstream
+    # follows its weight no matter how many requests it has queued.
+    def __init__(self, concurrency: int = UPSTREAM_CONCURRENCY) -> None:
+        self.concurrency = concurrency
+        self.active = 0
+        self.virtual_time = 0.0
+        self.finish_tags: dict[str, float] = {}
+        self.heap: list[tuple[float, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    async def acquire(self, client: ClientInfo) -> None:
+        start = max(self.virtual_time, self.finish_tags.get(client.id, 0.0))
+        tag = self.finish_tags[client.id] = start + 1 / client.weight
+        if self.active < self.concurrency and not self.heap:
+            self.active += 1
+            self.virtual_time = start
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.heap, (tag, next(self._seq), future))
+        try:
+            await future
+        except BaseException:
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                future.cancel()
+            raise
+
+    def release(self) -> None:
+        while self.heap:
+            tag, _, future = heapq.heappop(self.heap)
+            if not future.done():
+                self.virtual_time = tag
+                future.set_result(None)
+                return
+        self.active -= 1
+        if not self.active:
+            # Idle: forget clients so finish tags don't grow without bound.
+            self.finish_tags.clear()
+            self.virtual_time = 0.0
+
+    @contextlib.asynccontextmanager
+    async def slot(self, client: ClientInfo | None = None) -> AsyncIterator[None]:
+        await self.acquire(client or current_client.get())
+        try:
+            yield
+        finally:
+            self.release()
+
+
+_schedulers: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[str, FairScheduler]
+] = weakref.WeakKeyDictionary()
+
+
+def get_scheduler(host: str) -> FairScheduler:
+    schedulers = _schedulers.setdefault(asyncio.get_running_loop(), {})
+    if (scheduler := schedulers.get(host)) is None:
+        scheduler = schedulers[host] = FairScheduler()
+    return scheduler
+
+
+def scheduler_stats() -> dict[str, dict[str, int]]:
+    schedulers = _schedulers.get(asyncio.get_running_loop(), {})
+    return {
+        host: {"active": scheduler.active, "queued": len(scheduler.heap)}
+        for host, scheduler in list(schedulers.items())
+    }
@@ -0,0 +1,139 @@
+import importlib
+import io
+import logging
+import pickle
+import struct
+import zlib
+from typing import Any
+
+from aiocache.serializers import BaseSerializer
+from google.protobuf import descriptor_pool, message_factory
+from google.protobuf.message import Message
+
+from app.core import Coordinate, Library
+
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+    logger.debug("zstandard not installed, falling back to zlib compression")
+
+
+SCHEMA_VERSION = 1
+MAGIC = b"HK"
+HEADER = struct.Struct("!2sBB")
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+
+
+def _load_message(full_name: str, data: bytes, module: str | None = None) -> Message:
+    # The pb2 module registers the type; services import theirs lazily.
+    if module:
+        importlib.import_module(module)
+    descriptor = descriptor_pool.Default().FindMessageTypeByName(full_name)
+    return message_factory.GetMessageClass(descriptor).FromString(data)
+
+
+def _load_library(
+    id: str, name: str, latitude: float | None, longitude: float | None
+) -> Library:
+    return Library(
+        id=id,
+        name=name,
+        coordinate=(
+            Coordinate(latitude=latitude, longitude=longitude)
+            if latitude is not None and longitude is not None
+            else None
+        ),
+    )
+
+
+def _load_coordinate(latitude: float, longitude: float) -> Coordinate:
+    return Coordinate(latitude=latitude, longitude=longitude)
+
+
+class _CompactPickler(pickle.Pickler):
+    def reducer_override(self, obj):
+        if isinstance(obj, Message):
+            return _load_message, (
+                obj.DESCRIPTOR.full_name,
+                obj.SerializeToString(),
+                type(obj).__module__,
+            )
+        if type(obj) is Library:
+            coordinate = obj.coordinate
+            return _load_library, (
+                obj.id,
+                obj.name,
+                coordinate.latitude if coordinate else None,
+                coordinate.longitude if coordinate else None,
+            )
+        if type(obj) is Coordinate:
+            return _load_coordinate, (obj.latitude, obj.longitude)
+        return NotImplemented
+
+
+class CompactSerializer(BaseSerializer):
+    DEFAULT_ENCODING = None
+
+    def __init__(
+        self,
+        *args,
+        compression: str | None = "zlib",
+        compress_threshold: int = 1024,
+        level: int | None = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        if compression == "zstd" and zstandard is None:
+            logger.warning("zstandard is not installed, using zlib instead")
+            compression = "zlib"
+        if compression not in (None, "none", "zlib", "zstd"):
+            raise ValueError(f"Unknown compression {compression!r}")
+        self.codec = {"zlib": CODEC_ZLIB, "zstd": CODEC_ZSTD}.get(
+            compression or "none", CODEC_NONE
+        )
+        self.compress_threshold = compress_threshold
+        self.level = level
+
+    def _compress(self, data: bytes) -> tuple[int, bytes]:
+        if self.codec == CODEC_NONE or len(data) < self.compress_threshold:
+            return CODEC_NONE, data
+        if self.codec == CODEC_ZSTD:
+            compressor = zstandard.ZstdCompressor(level=self.level or 3)
+            return CODEC_ZSTD, compressor.compress(data)
+        level = self.level if self.level is not None else 6
+        return CODEC_ZLIB, zlib.compress(data, level)
+
+    def _decompress(self, codec: int, data: bytes) -> bytes:
+        if codec == CODEC_NONE:
+            return data
+        if codec == CODEC_ZLIB:
+            return zlib.decompress(data)
+        if codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise RuntimeError("zstandard is required to read this cache value")
+            return zstandard.ZstdDecompressor().decompress(data)
+        raise ValueError(f"Unknown codec {codec}")
+
+    def dumps(self, value: Any) -> bytes:
+        with io.BytesIO() as f:
+            _CompactPickler(f, protocol=pickle.HIGHEST_PROTOCOL).dump(value)
+            codec, payload = self._compress(f.getvalue())
+        return HEADER.pack(MAGIC, SCHEMA_VERSION, codec) + payload
+
+    def loads(self, value: bytes | None) -> Any:
+        if not isinstance(value, bytes):
+            return value
+        if not value.startswith(MAGIC):
+            return pickle.loads(value)
+        _, version, codec = HEADER.unpack_from(value)
+        if version != SCHEMA_VERSION:
+            logger.debug(f"Ignoring cache value with schema version {version}")
+            return None
+        return pickle.loads(self._decompress(codec, value[HEADER.size :]))
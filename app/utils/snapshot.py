@@ -0,0 +1,117 @@
+import dataclasses
+import logging
+import pathlib
+import time
+from typing import Any, Awaitable, Callable
+
+from aiocache import caches
+from aiocache.base import SENTINEL
+from aiocache.plugins import BasePlugin
+
+from app.utils.cache import RefreshEntry
+from app.utils.serializers import CompactSerializer
+
+
+logger = logging.getLogger(__name__)
+
+
+SNAPSHOT_VERSION = 2
+
+
+@dataclasses.dataclass
+class SnapshotEntry:
+    key: str
+    value: Any
+    ttl: float | None
+    created_at: float
+
+    def remaining_ttl(self, now: float) -> float | None:
+        return self.created_at + self.ttl - now if self.ttl else None
+
+
+class SnapshotRecorder(BasePlugin):
+    # Collects the keys the warm-up touches, whether it hit or wrote them; the
+    # values are read back afterwards so warm and persistent caches export too.
+    def __init__(self) -> None:
+        self.keys: dict[str, float | None] = {}
+
+    async def post_get(self, client, key, ret=None, **kwargs):
+        if ret is not None:
+            self.keys.setdefault(key, None)
+
+    async def post_set(self, client, key, value, ttl=SENTINEL, ret=None, **kwargs):
+        if not ret:
+            return
+        if ttl is SENTINEL:
+            ttl = client.ttl
+        self.keys[key] = time.time() + ttl if ttl else None
+
+
+def expiry(value: Any, expires_at: float | None) -> float | None:
+    if expires_at is not None or not isinstance(value, RefreshEntry):
+        return expires_at
+    # Entries written before expires_at was recorded only know when they go stale.
+    return value.expires_at or value.refresh_at
+
+
+async def export_snapshot(
+    path: pathlib.Path, warm: Callable[[], Awaitable[Any]], alias: str = "default"
+) -> int:
+    cache = caches.get(alias)
+    recorder = SnapshotRecorder()
+    cache.plugins = [*cache.plugins, recorder]
+    try:
+        await warm()
+    finally:
+        cache.plugins = [p for p in cache.plugins if p is not recorder]
+
+    now = time.time()
+    entries = []
+    for key, expires_at in recorder.keys.items():
+        if (value := await cache.get(key)) is None:
+            continue
+        expires_at = expiry(value, expires_at)
+        if expires_at is not None and expires_at <= now:
+            continue
+        entries.append(
+            SnapshotEntry(
+                key=key,
+                value=value,
+                ttl=expires_at - now if expires_at is not None else None,
+                created_at=now,
+            )
+        )
+
+    data = CompactSerializer().dumps(
+        {"version": SNAPSHOT_VERSION, "created_at": now, "entries": entries}
+    )
+    path.write_bytes(data)
+    logger.info(f"Exported {len(entries)} cache entries to {path}")
+    return len(entries)
+
+
+async def load_snapshot(path: pathlib.Path, alias: str = "default") -> int:
+    try:
+        snapshot = CompactSerializer().loads(path.read_bytes())
+    except FileNotFoundError:
+        logger.warning(f"Cache snapshot {path} does not exist")
+        return 0
+    if not snapshot or snapshot.get("version") != SNAPSHOT_VERSION:
+        logger.warning(f"Ignoring incompatible cache snapshot {path}")
+        return 0
+
+    cache = caches.get(alias)
+    now = time.time()
+    loaded = expired = 0
+    for entry in snapshot["entries"]:
+        ttl = entry.remaining_ttl(now)
+        if ttl is not None and ttl <= 0:
+            expired += 1
+            continue
+        if await cache.exists(entry.key):
+            continue
+        await cache.set(entry.key, entry.value, ttl=ttl)
+        loaded += 1
+    age = now - snapshot["created_at"]
+    logger.info(f"Loaded {loaded} cache entries from {path} ({age=:.0f}s, {expired=})")
+    return loaded
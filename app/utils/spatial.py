@@ -0,0 +1,126 @@
+import math
+import time
+from typing import Iterable
+
+from app.core import Library
+
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+# Rings walked at most before a full scan is cheaper: (2 * 50 + 1) ** 2 cells.
+MAX_RING = 50
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex:
+    def __init__(
+        self, points: Iterable[tuple[str, float, float]], cell_deg: float = 0.01
+    ) -> None:
+        self.cell_deg = cell_deg
+        self.cells: dict[tuple[int, int], list[tuple[str, float, float]]] = {}
+        for point in points:
+            self.cells.setdefault(self._cell(point[1], point[2]), []).append(point)
+        self.size = sum(len(cell) for cell in self.cells.values())
+        self.max_abs_lat = max(
+            (abs(lat) for cell in self.cells.values() for _, lat, _ in cell),
+            default=0.0,
+        )
+        if self.cells:
+            self.bounds = (
+                min(i for i, _ in self.cells),
+                max(i for i, _ in self.cells),
+                min(j for _, j in self.cells),
+                max(j for _, j in self.cells),
+            )
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _cell(self, lat: float, lng: float) -> tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg)
+
+    def _ring(self, ci: int, cj: int, r: int) -> Iterable[tuple[int, int]]:
+        if r == 0:
+            yield ci, cj
+            return
+        for j in range(cj - r, cj + r + 1):
+            yield ci - r, j
+            yield ci + r, j
+        for i in range(ci - r + 1, ci + r):
+            yield i, cj - r
+            yield i, cj + r
+
+    def nearest(
+        self,
+        lat: float,
+        lng: float,
+        limit: int | None = None,
+        radius_km: float | None = None,
+    ) -> list[tuple[str, float]]:
+        if not self.cells or limit == 0:
+            return []
+
+        ci, cj = self._cell(lat, lng)
+        min_i, max_i, min_j, max_j = self.bounds
+        max_ring = max(ci - min_i, max_i - ci, cj - min_j, max_j - cj, 0)
+        # Walking from outside the data costs the square of the distance to it.
+        if max_ring > MAX_RING or not (min_i <= ci <= max_i and min_j <= cj <= max_j):
+            return self._scan(lat, lng, limit, radius_km)
+        lat_factor = math.cos(math.radians(min(89.0, max(abs(lat), self.max_abs_lat))))
+        cell_km = self.cell_deg * KM_PER_DEGREE * lat_factor
+
+        found: list[tuple[float, str]] = []
+        for r in range(max_ring + 1):
+            for cell in self._ring(ci, cj, r):
+                for library_id, plat, plng in self.cells.get(cell, ()):
+                    distance = haversine_km(lat, lng, plat, plng)
+                    if radius_km is None or distance <= radius_km:
+                        found.append((distance, library_id))
+            covered_km = r * cell_km
+            if radius_km is not None and covered_km >= radius_km:
+                break
+            if limit is not None and len(found) >= limit:
+                found.sort()
+                if found[limit - 1][0] <= covered_km:
+                    break
+
+        found.sort()
+        return [(library_id, distance) for distance, library_id in found[:limit]]
+
+    def _scan(
+        self, lat: float, lng: float, limit: int | None, radius_km: float | None
+    ) -> list[tuple[str, float]]:
+        found = sorted(
+            (haversine_km(lat, lng, plat, plng), library_id)
+            for cell in self.cells.values()
+            for library_id, plat, plng in cell
+        )
+        if radius_km is not None:
+            found = [item for item in found if item[0] <= radius_km]
+        return [(library_id, distance) for distance, library_id in found[:limit]]
+
+
+class LibraryIndex:
+    def __init__(self, cell_deg: float = 0.01) -> None:
+        self.cell_deg = cell_deg
+        self.fingerprint: int | None = None
+        self.updated_at: float | None = None
+        self.index = GridIndex([], cell_deg=cell_deg)
+
+    def update(self, libraries: Iterable[Library]) -> GridIndex:
+        points = tuple(
+            (lib.id, lib.coordinate.latitude, lib.coordinate.longitude)
+            for lib in libraries
+            if lib.coordinate
+        )
+        if (fingerprint := hash(points)) != self.fingerprint:
+            self.index = GridIndex(points, cell_deg=self.cell_deg)
+            self.fingerprint = fingerprint
+            self.updated_at = time.time()
+        return self.index
@@ -0,0 +1,88 @@
+import contextlib
+import contextvars
+import os
+import time
+from typing import Any, ContextManager, Iterator
+
+import sentry_sdk
+from sentry_sdk.tracing import Transaction
+
+
+SENTRY_TRACES_SAMPLE_RATE = float(os.environ.get("SENTRY_TRACES_SAMPLE_RATE", 0.05))
+SENTRY_PROFILES_SAMPLE_RATE = float(os.environ.get("SENTRY_PROFILES_SAMPLE_RATE", 0.05))
+SENTRY_SLOW_SEARCH = float(os.environ.get("SENTRY_SLOW_SEARCH", 3))
+
+SEARCH_TRANSACTION = "heekkr.Resolver/Search"
+
+_no_span = contextlib.nullcontext()
+_rejected: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "rejected", default=False
+)
+
+
+def traces_sampler(sampling_context: dict[str, Any]) -> float:
+    if (parent_sampled := sampling_context.get("parent_sampled")) is not None:
+        return float(parent_sampled)
+    return SENTRY_TRACES_SAMPLE_RATE
+
+
+def init(dsn: str) -> None:
+    sentry_sdk.init(
+        dsn=dsn,
+        traces_sampler=traces_sampler,
+        profiles_sample_rate=SENTRY_PROFILES_SAMPLE_RATE,
+    )
+
+
+def _keep(hub: sentry_sdk.Hub, tx: Transaction, tags: list[str]) -> None:
+    # The search wasn't sampled, so it recorded no spans; a bare transaction with
+    # its timing and outcome still surfaces it without tracing every search.
+    kept = hub.start_transaction(
+        op=tx.op, name=tx.name, sampled=True, start_timestamp=tx.start_timestamp
+    )
+    for tag in tags:
+        kept.set_tag(tag, "true")
+    kept.finish(hub)
+
+
+@contextlib.contextmanager
+def transaction(name: str, op: str = "grpc.server") -> Iterator[None]:
+    # A hub per request keeps concurrent requests from sharing the current span.
+    with sentry_sdk.Hub(sentry_sdk.Hub.current) as hub, hub.start_transaction(
+        op=op, name=name
+    ) as tx:
+        _rejected.set(False)
+        started_at = time.monotonic()
+        tags = []
+        try:
+            yield
+        except Exception:
+            tags.append("rejected" if _rejected.get() else "failed")
+            raise
+        finally:
+            if (
+                not _rejected.get()
+                and time.monotonic() - started_at >= SENTRY_SLOW_SEARCH
+            ):
+                tags.append("slow")
+            for tag in tags:
+                tx.set_tag(tag, "true")
+            if (
+                name == SEARCH_TRANSACTION
+                and not tx.sampled
+                and ("failed" in tags or "slow" in tags)
+            ):
+                _keep(hub, tx, tags)
+
+
+def reject() -> None:
+    # Load shedding aborts on purpose, so the request is sampled like a success
+    # instead of being kept as failed: overload must not send more transactions.
+    _rejected.set(True)
+
+
+def span(op: str, description: str | None = None) -> ContextManager[Any]:
+    parent = sentry_sdk.Hub.current.scope.span
+    if parent is None or not parent.sampled:
+        return _no_span
+    return parent.start_child(op=op, description=description)
@@ -0,0 +1,69 @@
+import collections
+import dataclasses
+import time
+from typing import AsyncIterable, TypeVar
+
+from app.utils import metrics
+from app.utils.cost import record_service_time
+
+
+T = TypeVar("T")
+
+
+@dataclasses.dataclass
+class UpstreamSummary:
+    count: int
+    success_rate: float
+    p90_latency: float
+
+
+class UpstreamStats:
+    def __init__(self, window: float = 60.0, max_samples: int = 1000) -> None:
+        self.window = window
+        self.samples: collections.deque[tuple[float, bool, float]] = collections.deque(
+            maxlen=max_samples
+        )
+
+    def record(self, ok: bool, latency: float, now: float | None = None) -> None:
+        self.samples.append((time.monotonic() if now is None else now, ok, latency))
+
+    def summary(self, now: float | None = None) -> UpstreamSummary:
+        since = (time.monotonic() if now is None else now) - self.window
+        while self.samples and self.samples[0][0] < since:
+            self.samples.popleft()
+        if not self.samples:
+            return UpstreamSummary(count=0, success_rate=1.0, p90_latency=0.0)
+        latencies = sorted(latency for _, _, latency in self.samples)
+        return UpstreamSummary(
+            count=len(self.samples),
+            success_rate=sum(ok for _, ok, _ in self.samples) / len(self.samples),
+            p90_latency=latencies[int(0.9 * (len(latencies) - 1))],
+        )
+
+
+class UpstreamTracker:
+    def __init__(self, window: float = 60.0) -> None:
+        self.window = window
+        self.stats: dict[str, UpstreamStats] = {}
+
+    def get(self, name: str) -> UpstreamStats:
+        if (stats := self.stats.get(name)) is None:
+            stats = self.stats[name] = UpstreamStats(self.window)
+        return stats
+
+    def record(self, name: str, ok: bool, latency: float) -> None:
+        self.get(name).record(ok, latency)
+        record_service_time(name, latency)
+        if metrics.is_enabled():
+            metrics.stage_seconds.observe(latency, name, "stream")
+
+    async def track(self, name: str, iterable: AsyncIterable[T]) -> AsyncIterable[T]:
+        started_at = time.monotonic()
+        try:
+            async for item in iterable:
+                yield item
+        except Exception:
+            self.record(name, False, time.monotonic() - started_at)
+            raise
+        # Streams closed early by the client are neither a success nor a failure.
+        self.record(name, True, time.monotonic() - started_at)
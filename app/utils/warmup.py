@@ -0,0 +1,57 @@
+import asyncio
+import dataclasses
+import logging
+import time
+from typing import Mapping
+
+from app.core import Service
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class WarmupResult:
+    completed: list[str]
+    failed: list[str]
+    pending: list[str]
+    elapsed: float
+
+
+_background: set[asyncio.Task] = set()
+
+
+async def warm_up(services: Mapping[str, Service], budget: float) -> WarmupResult:
+    started_at = time.monotonic()
+
+    async def run(name: str) -> bool:
+        try:
+            await services[name].warm_up()
+        except Exception:
+            logger.warning(f"Couldn't warm up {name}", exc_info=True)
+            return False
+        logger.info(f"Warmed up {name} in {time.monotonic() - started_at:.2f}s")
+        return True
+
+    tasks = {name: asyncio.create_task(run(name)) for name in services}
+    if tasks:
+        await asyncio.wait(tasks.values(), timeout=budget)
+
+    result = WarmupResult(completed=[], failed=[], pending=[], elapsed=0.0)
+    for name, task in tasks.items():
+        if not task.done():
+            # Stragglers keep running so their results still land in the cache.
+            _background.add(task)
+            task.add_done_callback(_background.discard)
+            result.pending.append(name)
+        elif task.result():
+            result.completed.append(name)
+        else:
+            result.failed.append(name)
+    result.elapsed = time.monotonic() - started_at
+    logger.info(
+        f"Warm-up finished in {result.elapsed:.2f}s "
+        f"({len(result.completed)} ok, {len(result.failed)} failed, "
+        f"{len(result.pending)} still running)"
+    )
+    return result
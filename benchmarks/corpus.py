@@ -0,0 +1,118 @@
+import argparse
+import copy
+import itertools
+import pathlib
+import re
+
+from bs4 import BeautifulSoup, Tag
+
+from app.services import gdlib, sblib, seoul_seodaemun, seoul_songpa
+from app.services.common.jnet import JnetSearcher
+from benchmarks import fixtures
+
+
+# One service per markup flavour: jnet type A without and with a text export,
+# songpa/seodaemun type B without and with an Excel export.
+FLAVOURS: dict[str, type[JnetSearcher]] = {
+    "gdlib": gdlib.Searcher,
+    "sblib": sblib.Searcher,
+    "seoul-seodaemun": seoul_seodaemun.Searcher,
+    "seoul-songpa": seoul_songpa.Searcher,
+}
+RE_KEY = re.compile(r"\d{6,}")
+
+parser = argparse.ArgumentParser()
+parser.add_argument("-r", "--rows", type=int, default=1000)
+parser.add_argument("-l", "--libraries", type=int, default=100)
+parser.add_argument("-o", "--output", type=pathlib.Path, required=True)
+
+
+def replicate(items: list[Tag], count: int, vary) -> None:
+    # Replaces the items in their parent by `count` varied copies of them.
+    for i, item in zip(range(count), itertools.cycle(items)):
+        clone = copy.copy(item)
+        vary(clone, i)
+        items[0].insert_before(clone)
+    for item in items:
+        item.decompose()
+
+
+def index_page(searcher: JnetSearcher, text: str, count: int) -> str:
+    soup = BeautifulSoup(text, "lxml")
+    items = [
+        li
+        for li in searcher._get_libraries_select_items(soup)
+        if (input := searcher._get_libraries_select_input(li))
+        and input.attrs.get("value") != "ALL"
+    ]
+
+    def vary(li: Tag, i: int) -> None:
+        searcher._get_libraries_select_input(li).attrs["value"] = f"S{i:03d}"
+        if label := li.select_one("label"):
+            label.string = f"{label.text.strip()}{i}"
+
+    replicate(items, count, vary)
+    return str(soup)
+
+
+def result_page(searcher: JnetSearcher, text: str, count: int) -> str:
+    soup = BeautifulSoup(text, "lxml")
+
+    def vary(li: Tag, i: int) -> None:
+        # Record keys are unique per row, as on the real sites.
+        for tag in [li, *li.find_all(True)]:
+            for name in ("onclick", "value", "href"):
+                if isinstance(value := tag.attrs.get(name), str):
+                    tag.attrs[name] = RE_KEY.sub(
+                        lambda m: str(int(m.group()) + i * 1_000), value
+                    )
+
+    replicate(searcher.search_select_results(soup), count, vary)
+    return str(soup)
+
+
+def export_rows(header: tuple, rows: list[tuple], count: int) -> list[tuple]:
+    return [
+        tuple(header),
+        *(
+            (str(i + 1), *row[1:])
+            for i, row in zip(range(count), itertools.cycle(rows))
+        ),
+    ]
+
+
+def generate(service: str, rows: int, libraries: int) -> fixtures.Fixture:
+    searcher = FLAVOURS[service]()
+    fixture = fixtures.for_service(service)
+    text = excel_rows = None
+    if fixture.export_text is not None:
+        header, *data = (line.split("\t") for line in fixture.export_text.splitlines())
+        text = "\n".join("\t".join(row) for row in export_rows(header, data, rows))
+    if fixture.export_rows is not None:
+        header, *data = fixture.export_rows
+        excel_rows = export_rows(header, data, rows)
+    return fixtures.Fixture(
+        index=index_page(searcher, fixture.index, libraries),
+        result=result_page(searcher, fixture.result, rows),
+        export_text=text,
+        export_rows=excel_rows,
+    )
+
+
+def main():
+    args = parser.parse_args()
+    args.output.mkdir(parents=True, exist_ok=True)
+    for service in FLAVOURS:
+        fixture = generate(service, args.rows, args.libraries)
+        name = fixtures.SERVICE_FIXTURES[service]
+        (args.output / f"{name}_index.html").write_text(fixture.index)
+        (args.output / f"{name}_result.html").write_text(fixture.result)
+        if fixture.export_text is not None:
+            (args.output / f"{name}_export.txt").write_text(fixture.export_text)
+        if fixture.export_rows is not None:
+            (args.output / f"{name}_export.xlsx").write_bytes(fixture.export_excel)
+        print(f"{service}: {args.rows} rows, {args.libraries} libraries")
+
+
+if __name__ == "__main__":
+    main()
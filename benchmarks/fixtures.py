@@ -0,0 +1,92 @@
+import dataclasses
+import functools
+import importlib
+import io
+import pathlib
+
+from app.services.common.jnet import JnetSearcher
+from app.utils.gazetteer import Gazetteer
+
+
+FIXTURES = pathlib.Path(__file__).parent.parent / "tests" / "services"
+
+# Services without fixtures of their own share the markup of a similar site.
+SERVICE_FIXTURES = {
+    "gdlib": "gdlib",
+    "sblib": "sblib",
+    "seoul-seodaemun": "sdmlib",
+    "seoul-songpa": "splib",
+}
+DEFAULT_FIXTURE = "sblib"
+
+
+@dataclasses.dataclass(frozen=True)
+class Fixture:
+    index: str
+    result: str
+    export_text: str | None
+    export_rows: list[tuple] | None
+
+    @functools.cached_property
+    def export_excel(self) -> bytes | None:
+        from openpyxl import Workbook
+
+        rows = self.export_rows
+        if rows is None and self.export_text is not None:
+            rows = [line.split("\t") for line in self.export_text.splitlines()]
+        if rows is None:
+            return None
+        workbook = Workbook()
+        for row in rows:
+            workbook.active.append(row)
+        with io.BytesIO() as f:
+            workbook.save(f)
+            return f.getvalue()
+
+
+@functools.cache
+def load(name: str, directory: pathlib.Path = FIXTURES) -> Fixture:
+    export_text = export_rows = None
+    if (path := directory / f"{name}_export.txt").exists():
+        export_text = path.read_text()
+    if (directory / f"{name}_export.py").exists():
+        export_rows = importlib.import_module(f"tests.services.{name}_export").values
+    if (path := directory / f"{name}_export.xlsx").exists():
+        from openpyxl import load_workbook
+
+        export_rows = list(load_workbook(path, data_only=True).active.values)
+    return Fixture(
+        index=(directory / f"{name}_index.html").read_text(),
+        result=(directory / f"{name}_result.html").read_text(),
+        export_text=export_text,
+        export_rows=export_rows,
+    )
+
+
+def for_service(service: str, directory: pathlib.Path = FIXTURES) -> Fixture:
+    return load(SERVICE_FIXTURES.get(service, DEFAULT_FIXTURE), directory)
+
+
+def searcher(base: type[JnetSearcher], fixture: Fixture, key: str) -> JnetSearcher:
+    class Searcher(base):
+        def __repr__(self) -> str:
+            # Keeps the cached library lists of each fixture apart.
+            return f"{__name__}.{key}"
+
+        def get_gazetteer(self) -> Gazetteer:
+            return Gazetteer()
+
+        async def get_libraries_response(self) -> str:
+            return fixture.index
+
+        async def search_response(self, *args, **kwargs) -> str:
+            return fixture.result
+
+        async def export_to_text_response(self, *args, **kwargs) -> str | None:
+            return fixture.export_text
+
+        async def export_to_excel_response(self, *args, **kwargs):
+            if fixture.export_excel is not None:
+                return self.read_excel(fixture.export_excel)
+
+    return Searcher()
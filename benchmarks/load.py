@@ -0,0 +1,336 @@
+import argparse
+import asyncio
+import collections
+import functools
+import json
+import os
+import pathlib
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import grpc
+from aiohttp import web
+from grpc_health.v1.health_pb2 import HealthCheckRequest
+from grpc_health.v1.health_pb2_grpc import HealthStub
+from heekkr.resolver_pb2 import GetLibrariesRequest, SearchRequest
+from heekkr.resolver_pb2_grpc import ResolverStub
+
+from app.core import services
+from app.utils.health import RESOLVER_SERVICE, SERVING
+from benchmarks import fixtures
+
+
+ROOT = pathlib.Path(__file__).parent.parent
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--qps", type=float, default=5)
+parser.add_argument("-d", "--duration", type=float, default=30)
+parser.add_argument("--latency", type=float, default=0.2, help="upstream seconds")
+parser.add_argument("--jitter", type=float, default=0.05, help="upstream stddev")
+parser.add_argument("--error-rate", type=float, default=0.0, help="upstream 503s")
+parser.add_argument(
+    "--get-libraries-ratio",
+    type=float,
+    default=0.1,
+    help="share of requests that are GetLibraries rather than Search",
+)
+parser.add_argument("--fanout", type=int, default=2, help="services per search")
+parser.add_argument("--seed", type=int, default=0)
+parser.add_argument(
+    "--fixtures",
+    type=pathlib.Path,
+    default=fixtures.FIXTURES,
+    help="directory of pages to serve, e.g. from benchmarks.corpus",
+)
+parser.add_argument(
+    "--warmup-budget", type=float, default=30, help="resolver warm-up seconds"
+)
+parser.add_argument(
+    "--target", help="existing resolver (started with UPSTREAM_OVERRIDES)"
+)
+parser.add_argument("-o", "--output", type=pathlib.Path)
+parser.add_argument("-v", "--verbose", action="store_true", help="show resolver logs")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def fake_upstream(
+    service: str,
+    latency: float,
+    jitter: float,
+    error_rate: float,
+    rng: random.Random,
+    directory: pathlib.Path = fixtures.FIXTURES,
+) -> web.Application:
+    searcher = services[service].searcher
+    fixture = fixtures.for_service(service, directory)
+    counters = collections.Counter()
+
+    @web.middleware
+    async def inject(request: web.Request, handler):
+        counters["requests"] += 1
+        await asyncio.sleep(max(0.0, rng.gauss(latency, jitter)))
+        if rng.random() < error_rate:
+            counters["errors"] += 1
+            raise web.HTTPServiceUnavailable()
+        return await handler(request)
+
+    def respond(body: str | bytes | None, content_type: str = "text/html"):
+        async def handle(request: web.Request) -> web.Response:
+            if body is None:
+                raise web.HTTPNotFound()
+            return web.Response(body=body, content_type=content_type)
+
+        return handle
+
+    app = web.Application(middlewares=[inject])
+    app["counters"] = counters
+    app.router.add_get(searcher.path_search_index, respond(fixture.index))
+    app.router.add_post(searcher.path_search, respond(fixture.result))
+    try:
+        path = searcher.path_export_text
+    except NotImplementedError:
+        pass
+    else:
+        app.router.add_post(path, respond(fixture.export_text, "text/plain"))
+    try:
+        path = searcher.path_export_excel
+    except NotImplementedError:
+        pass
+    else:
+        app.router.add_get(
+            path,
+            respond(
+                fixture.export_excel,
+                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            ),
+        )
+    return app
+
+
+async def start_fake_upstreams(
+    latency: float,
+    jitter: float,
+    error_rate: float,
+    rng: random.Random,
+    directory: pathlib.Path = fixtures.FIXTURES,
+) -> tuple[dict[str, web.AppRunner], dict[str, str]]:
+    runners, overrides = {}, {}
+    for service in services:
+        app = fake_upstream(service, latency, jitter, error_rate, rng, directory)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        port = free_port()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        runners[service] = runner
+        overrides[services[service].searcher.url_base] = f"http://127.0.0.1:{port}"
+    return runners, overrides
+
+
+def spawn_resolver(
+    bind: str, overrides: dict[str, str], warmup_budget: float, verbose: bool = False
+) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "UPSTREAM_OVERRIDES": ",".join(f"{k}={v}" for k, v in overrides.items()),
+    }
+    # Never geocode fixture libraries against the real API.
+    env.pop("KAKAO_API_KEY", None)
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "run.py",
+            "--bind",
+            bind,
+            "--metrics-port",
+            "0",
+            "--warmup-budget",
+            str(warmup_budget),
+        ],
+        cwd=ROOT,
+        env=env,
+        stdout=None if verbose else subprocess.DEVNULL,
+        stderr=None if verbose else subprocess.DEVNULL,
+    )
+
+
+async def wait_until_serving(channel: grpc.aio.Channel, timeout: float) -> None:
+    # Startup parsing lags the loop, and admission sheds searches until it settles.
+    health = HealthStub(channel)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            response = await health.Check(HealthCheckRequest(service=RESOLVER_SERVICE))
+            if response.status == SERVING:
+                return
+        except grpc.aio.AioRpcError:
+            pass
+        if time.monotonic() > deadline:
+            raise TimeoutError("Resolver did not become SERVING")
+        await asyncio.sleep(0.5)
+
+
+async def get_libraries(stub: ResolverStub, record: dict) -> None:
+    await stub.GetLibraries(GetLibrariesRequest())
+
+
+async def search(stub: ResolverStub, request: SearchRequest, record: dict) -> None:
+    started_at = time.perf_counter()
+    async for response in stub.Search(request):
+        if "first_entity" not in record:
+            record["first_entity"] = time.perf_counter() - started_at
+        record["entities"] = record.get("entities", 0) + len(response.entities)
+
+
+async def issue(call, record: dict) -> None:
+    started_at = time.perf_counter()
+    try:
+        await call(record)
+    except grpc.aio.AioRpcError as e:
+        record["error"] = e.code().name
+    record["latency"] = time.perf_counter() - started_at
+
+
+async def drive(
+    stub: ResolverStub,
+    qps: float,
+    duration: float,
+    get_libraries_ratio: float,
+    fanout: int,
+    rng: random.Random,
+) -> list[dict]:
+    libraries = collections.defaultdict(list)
+    for library in (await stub.GetLibraries(GetLibrariesRequest())).libraries:
+        libraries[library.id.split(":")[0]].append(library.id)
+    names = sorted(libraries)
+
+    records, tasks = [], []
+    started_at = time.perf_counter()
+    # Open loop: requests start on schedule whether or not earlier ones finished.
+    for i in range(int(qps * duration)):
+        await asyncio.sleep(max(0.0, started_at + i / qps - time.perf_counter()))
+        if rng.random() < get_libraries_ratio:
+            record = {"method": "GetLibraries"}
+            call = functools.partial(get_libraries, stub)
+        else:
+            chosen = rng.sample(names, min(fanout, len(names)))
+            request = SearchRequest(
+                term=rng.choice(["편의점", "어린왕자", "파이썬", "토지"]),
+                library_ids=[id for name in chosen for id in libraries[name]],
+            )
+            record = {"method": "Search", "services": chosen}
+            call = functools.partial(search, stub, request)
+        records.append(record)
+        tasks.append(asyncio.create_task(issue(call, record)))
+    await asyncio.gather(*tasks)
+    return records
+
+
+def percentiles(values: list[float]) -> dict[str, float | None]:
+    values = sorted(values)
+    return {
+        f"p{p}": values[min(len(values) - 1, int(p / 100 * len(values)))] * 1e3
+        if values
+        else None
+        for p in (50, 95, 99)
+    }
+
+
+def summarize(records: list[dict], duration: float) -> dict:
+    report = {}
+    for method in ("Search", "GetLibraries"):
+        selected = [r for r in records if r["method"] == method]
+        ok = [r for r in selected if "error" not in r]
+        report[method] = {
+            "count": len(selected),
+            "qps": len(selected) / duration,
+            "error_rate": (len(selected) - len(ok)) / len(selected) if selected else 0,
+            "errors": dict(
+                collections.Counter(r["error"] for r in selected if "error" in r)
+            ),
+            "latency_ms": percentiles([r["latency"] for r in ok]),
+        }
+        if method == "Search":
+            report[method]["first_entity_ms"] = percentiles(
+                [r["first_entity"] for r in ok if "first_entity" in r]
+            )
+    return report
+
+
+async def run(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    runners, overrides = await start_fake_upstreams(
+        args.latency, args.jitter, args.error_rate, rng, args.fixtures
+    )
+    process = None
+    target = args.target
+    if target is None:
+        target = f"127.0.0.1:{free_port()}"
+        process = spawn_resolver(target, overrides, args.warmup_budget, args.verbose)
+    try:
+        async with grpc.aio.insecure_channel(target) as channel:
+            await wait_until_serving(channel, timeout=args.warmup_budget + 60)
+            stub = ResolverStub(channel)
+            records = await drive(
+                stub,
+                args.qps,
+                args.duration,
+                args.get_libraries_ratio,
+                args.fanout,
+                rng,
+            )
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        upstream_counters = {
+            service: dict(runner.app["counters"]) for service, runner in runners.items()
+        }
+        for runner in runners.values():
+            await runner.cleanup()
+
+    return {
+        "config": {
+            k: v
+            for k, v in vars(args).items()
+            if k not in ("output", "target", "verbose")
+        },
+        "upstreams": upstream_counters,
+        **summarize(records, args.duration),
+    }
+
+
+def main():
+    args = parser.parse_args()
+    report = asyncio.run(run(args))
+    data = json.dumps(report, ensure_ascii=False, indent=2, default=str)
+    if args.output:
+        args.output.write_text(data + "\n")
+    else:
+        print(data)
+
+    for method in ("Search", "GetLibraries"):
+        summary = report[method]
+        latency = summary["latency_ms"]
+        print(
+            f"{method:12s} {summary['count']:5d} reqs {summary['qps']:6.1f}qps "
+            f"errors={summary['error_rate']:.1%} "
+            + " ".join(f"{k}={v or 0:.0f}ms" for k, v in latency.items()),
+            file=sys.stderr,
+        )
+    first = report["Search"]["first_entity_ms"]
+    print(
+        "first entity " + " ".join(f"{k}={v or 0:.0f}ms" for k, v in first.items()),
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Awaitable, Callable
+
+from bs4 import BeautifulSoup
+
+from app import configure_caches
+from benchmarks import fixtures
+from app.services import gdlib, sblib, seoul_seodaemun, seoul_songpa
+from app.services.common.jnet import JnetSearcher
+from app.utils.text import select_closest
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("-n", "--number", type=int, default=20, help="calls per round")
+parser.add_argument("-r", "--repeat", type=int, default=5, help="timed rounds")
+parser.add_argument("-o", "--output", type=pathlib.Path)
+parser.add_argument("--compare", type=pathlib.Path, help="baseline JSON to compare")
+parser.add_argument(
+    "--threshold",
+    type=float,
+    default=0.5,
+    help="relative slowdown of the fastest round (or allocation growth) reported "
+    "as a regression",
+)
+
+
+SERVICES = {
+    "gdlib": gdlib.Searcher,
+    "sblib": sblib.Searcher,
+    "seoul-seodaemun": seoul_seodaemun.Searcher,
+    "seoul-songpa": seoul_songpa.Searcher,
+}
+
+
+async def collect(iterable) -> list:
+    return [item async for item in iterable]
+
+
+def export_infos(searcher: JnetSearcher, text: str) -> list[dict]:
+    results = searcher.search_select_results(BeautifulSoup(text, "lxml"))
+    return [
+        {"id": book_id, "args": {"entity": {}, "book": {}, "holding_summary": {}}}
+        for li in results
+        if (book_id := searcher.parse_id(li))
+    ]
+
+
+async def cases(searcher: JnetSearcher) -> dict[str, Callable[[], Awaitable[Any]]]:
+    libraries = await searcher.get_libraries()
+    names = [library.name for library in libraries]
+    candidates = [(library, library.name) for library in libraries]
+
+    async def match() -> list:
+        return [select_closest(candidates, name) for name in names]
+
+    benchmarks = {
+        "libraries": searcher._get_libraries,
+        "search": lambda: collect(searcher.search("", [])),
+        "select_closest": match,
+    }
+    if searcher.export_available:
+        infos = export_infos(searcher, await searcher.search_response("", []))
+        benchmarks["export"] = lambda: collect(searcher.export(infos))
+    return benchmarks
+
+
+async def measure(
+    func: Callable[[], Awaitable[Any]], number: int, repeat: int = 5
+) -> dict:
+    rows = len(await func())
+
+    # Like timeit: the fastest round is the least disturbed by the rest of the
+    # machine, the median shows typical cost.
+    rounds = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        for _ in range(number):
+            await func()
+        rounds.append((time.perf_counter() - started_at) / number)
+    per_page = statistics.median(rounds)
+
+    # Allocations are traced in a separate pass so tracing doesn't skew timings.
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        started, _ = tracemalloc.get_traced_memory()
+        result = await func()
+        after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        del result
+    finally:
+        tracemalloc.stop()
+    blocks = sum(
+        max(stat.count_diff, 0) for stat in after.compare_to(before, "filename")
+    )
+
+    return {
+        "rows": rows,
+        "ms_per_page": per_page * 1e3,
+        "ms_per_page_min": min(rounds) * 1e3,
+        "rows_per_sec": rows / per_page if rows else 0.0,
+        "peak_bytes": peak - started,
+        "retained_bytes": current - started,
+        "allocated_blocks": blocks,
+    }
+
+
+async def run(number: int, repeat: int) -> dict:
+    results = []
+    for service, base in SERVICES.items():
+        searcher = fixtures.searcher(base, fixtures.for_service(service), service)
+        for case, func in (await cases(searcher)).items():
+            results.append(
+                {
+                    "service": service,
+                    "case": case,
+                    **await measure(func, number, repeat),
+                }
+            )
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "number": number,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    previous = {(r["service"], r["case"]): r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        if not (base := previous.get((result["service"], result["case"]))):
+            continue
+        for metric in ("ms_per_page_min", "peak_bytes"):
+            if metric not in base:
+                continue
+            if base[metric] and result[metric] > base[metric] * (1 + threshold):
+                regressions.append(
+                    f"{result['service']} {result['case']} {metric}: "
+                    f"{base[metric]:.4g} -> {result[metric]:.4g} "
+                    f"({result[metric] / base[metric] - 1:+.0%})"
+                )
+    return regressions
+
+
+def main():
+    args = parser.parse_args()
+    # Fixtures only: never geocode missing libraries over the network.
+    os.environ.pop("KAKAO_API_KEY", None)
+    configure_caches()
+
+    report = asyncio.run(run(args.number, args.repeat))
+    data = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(data + "\n")
+    else:
+        print(data)
+
+    for result in report["results"]:
+        print(
+            f"{result['service']:16s} {result['case']:14s} {result['rows']:4d} rows "
+            f"{result['ms_per_page']:8.3f}ms/page {result['rows_per_sec']:10.0f}rows/s "
+            f"{result['peak_bytes'] / 1024:8.1f}KiB",
+            file=sys.stderr,
+        )
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        if regressions := compare(report, baseline, args.threshold):
+            print("Regressions:", *regressions, sep="\n  ", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import pathlib
+import sys
+
+from app import configure_caches
+from benchmarks import corpus, fixtures
+from benchmarks.parsers import collect, measure
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "-s",
+    "--sizes",
+    type=lambda v: [int(size) for size in v.split(",")],
+    default=[10, 100, 1000],
+    help="comma separated rows (and libraries) per page",
+)
+parser.add_argument("-n", "--number", type=int, default=3)
+parser.add_argument(
+    "--libraries", type=int, default=30, help="libraries while scaling rows"
+)
+parser.add_argument(
+    "--max-exponent",
+    type=float,
+    default=1.2,
+    help="flag cases whose time or memory grows faster than size**EXPONENT",
+)
+parser.add_argument("-o", "--output", type=pathlib.Path)
+
+
+def exponent(sizes: list[int], values: list[float]) -> float | None:
+    # Growth between the two largest sizes on log-log axes: 1 is linear, 2 is
+    # quadratic. Smaller sizes are dominated by the fixed cost of each page.
+    points = sorted((s, v) for s, v in zip(sizes, values) if v > 0)[-2:]
+    if len(points) < 2 or points[0][0] == points[1][0]:
+        return None
+    (s1, v1), (s2, v2) = points
+    return math.log(v2 / v1) / math.log(s2 / s1)
+
+
+async def sweep(service: str, sizes: list[int], number: int, libraries: int):
+    results = {}
+    for size in sizes:
+        searchers = {
+            "libraries": fixtures.searcher(
+                corpus.FLAVOURS[service],
+                corpus.generate(service, rows=1, libraries=size),
+                f"{service}:libraries:{size}",
+            ),
+            "search": fixtures.searcher(
+                corpus.FLAVOURS[service],
+                corpus.generate(service, rows=size, libraries=libraries),
+                f"{service}:search:{size}",
+            ),
+        }
+        cases = {
+            "libraries": searchers["libraries"]._get_libraries,
+            "search": lambda s=searchers["search"]: collect(s.search("", [])),
+        }
+        for case, func in cases.items():
+            results.setdefault(case, []).append(
+                {"size": size, **await measure(func, number, repeat=1)}
+            )
+    return results
+
+
+def plot(points: list[dict], width: int = 40) -> list[str]:
+    # Time per row stays flat for linear work; a rising bar means superlinear.
+    per_row = [p["ms_per_page"] / max(p["rows"], 1) for p in points]
+    top = max(per_row) or 1
+    return [
+        f"  {p['size']:>7d} {p['ms_per_page']:10.2f}ms "
+        f"{p['peak_bytes'] / 1024:10.0f}KiB {value * 1e3:9.1f}us/row "
+        f"|{'#' * round(value / top * width)}"
+        for p, value in zip(points, per_row)
+    ]
+
+
+async def run(args: argparse.Namespace) -> dict:
+    report = {"sizes": args.sizes, "number": args.number, "results": []}
+    for service in corpus.FLAVOURS:
+        for case, points in (
+            await sweep(service, args.sizes, args.number, args.libraries)
+        ).items():
+            sizes = [p["size"] for p in points]
+            report["results"].append(
+                {
+                    "service": service,
+                    "case": case,
+                    "points": points,
+                    "time_exponent": exponent(
+                        sizes, [p["ms_per_page"] for p in points]
+                    ),
+                    "memory_exponent": exponent(
+                        sizes, [p["peak_bytes"] for p in points]
+                    ),
+                }
+            )
+    return report
+
+
+def main():
+    args = parser.parse_args()
+    # Synthetic libraries are never geocoded over the network.
+    os.environ.pop("KAKAO_API_KEY", None)
+    configure_caches()
+
+    report = asyncio.run(run(args))
+    data = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(data + "\n")
+    else:
+        print(data)
+
+    superlinear = []
+    for result in report["results"]:
+        name = f"{result['service']} {result['case']}"
+        exponents = {k: result[f"{k}_exponent"] for k in ("time", "memory")}
+        print(
+            name
+            + " "
+            + " ".join(f"{k}~n^{v:.2f}" for k, v in exponents.items() if v is not None),
+            *plot(result["points"]),
+            sep="\n",
+            file=sys.stderr,
+        )
+        superlinear += [
+            f"{name} {k} grows as n^{v:.2f}"
+            for k, v in exponents.items()
+            if v is not None and v > args.max_exponent
+        ]
+    if superlinear:
+        print("Superlinear:", *superlinear, sep="\n  ", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
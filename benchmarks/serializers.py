@@ -0,0 +1,104 @@
+import argparse
+import pickle
+import timeit
+
+from aiocache.serializers import PickleSerializer
+from heekkr.book_pb2 import Book, PublishDate
+from heekkr.holding_pb2 import AvailableStatus, HoldingStatus, HoldingSummary
+from heekkr.resolver_pb2 import SearchEntity
+
+from app.core import Coordinate, Library
+from app.utils.cache import CacheEntity, dump_entity
+from app.utils.serializers import CompactSerializer, zstandard
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("-n", "--number", type=int, default=200)
+parser.add_argument("-s", "--size", type=int, default=100)
+
+
+def make_libraries(size: int) -> list[Library]:
+    return [
+        Library(
+            id=f"seoul-songpa:M{i:03d}",
+            name=f"송파{i}작은도서관",
+            coordinate=Coordinate(latitude=37.5 + i / 1000, longitude=127.1 + i / 1000),
+        )
+        for i in range(size)
+    ]
+
+
+def make_entities(size: int) -> list[SearchEntity]:
+    return [
+        SearchEntity(
+            book=Book(
+                isbn=f"979119257{i:04d}",
+                title=f"바다가 들리는 편의점. {i}",
+                author="마치다 소노코 지음 ; 황국영 옮김",
+                publisher="모모",
+                publish_date=PublishDate(year=2023),
+            ),
+            holding_summaries=[
+                HoldingSummary(
+                    library_id="gdlib:BR",
+                    location="해공종합자료실",
+                    call_number=f"833.6-마86ㅂ-{i}",
+                    status=HoldingStatus(available=AvailableStatus(detail="비치중")),
+                )
+            ],
+            url=f"https://gdlibrary.or.kr/detail?recKey={i}",
+        )
+        for i in range(size)
+    ]
+
+
+def legacy_gcs_dumps(value) -> bytes:
+    return pickle.dumps(
+        CacheEntity(value=PickleSerializer().dumps(value), expires_at=None)
+    )
+
+
+def compact_gcs_dumps(serializer: CompactSerializer):
+    def dumps(value) -> bytes:
+        return dump_entity(CacheEntity(value=serializer.dumps(value), expires_at=None))
+
+    return dumps
+
+
+def main():
+    args = parser.parse_args()
+
+    serializers = {
+        "pickle": PickleSerializer(),
+        "compact": CompactSerializer(compression=None),
+        "compact+zlib": CompactSerializer(compression="zlib"),
+    }
+    if zstandard is not None:
+        serializers["compact+zstd"] = CompactSerializer(compression="zstd")
+
+    datasets = {
+        "libraries": make_libraries(args.size),
+        "entities": make_entities(args.size),
+    }
+
+    print(
+        f"{'dataset':10s} {'serializer':14s} "
+        f"{'bytes':>8s} {'dumps':>10s} {'loads':>10s}"
+    )
+    for dataset, value in datasets.items():
+        for name, serializer in serializers.items():
+            data = serializer.dumps(value)
+            assert serializer.loads(data) == value
+            dumps = timeit.timeit(lambda: serializer.dumps(value), number=args.number)
+            loads = timeit.timeit(lambda: serializer.loads(data), number=args.number)
+            print(
+                f"{dataset:10s} {name:14s} {len(data):8d} "
+                f"{dumps / args.number * 1e6:8.1f}us {loads / args.number * 1e6:8.1f}us"
+            )
+        legacy = len(legacy_gcs_dumps(value))
+        compact = len(compact_gcs_dumps(serializers["compact+zlib"])(value))
+        print(f"{dataset:10s} gcs blob bytes: legacy={legacy} compact={compact}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,35 @@
 import argparse
 import asyncio
+import contextlib
+import cProfile
+import json
 import logging
+import os
 import pathlib
 import pickle
+import pstats
+import random
+import time
 
 from heekkr.resolver_pb2 import GetLibrariesRequest, SearchRequest
 
 from app import Resolver
+from app.core import services
+from app.utils import http, memory
+from app.utils.gazetteer import DEFAULT_GAZETTEER_PATH, Gazetteer
+from app.utils.http import close_sessions
+from app.utils.kakao import Kakao
+from app.utils.profiling import StackSampler
+from app.utils.snapshot import export_snapshot
 
 
 parser = argparse.ArgumentParser()
 parser.add_argument("-d", "--debug", action="store_true")
+parser.add_argument(
+    "--memory-profile",
+    action="store_true",
+    help="trace allocations and print peak/retained memory per request",
+)
 subparsers = parser.add_subparsers(title="command", dest="command", required=True)
 
 parser_libraries = subparsers.add_parser("libraries")
@@ -20,11 +39,203 @@ parser_search.add_argument("keyword")
 parser_search.add_argument("-l", "--library-ids", action="append", required=True)
 parser_search.add_argument("--export", type=pathlib.Path)
 
+parser_gazetteer = subparsers.add_parser("gazetteer")
+parser_gazetteer.add_argument(
+    "-o", "--output", type=pathlib.Path, default=DEFAULT_GAZETTEER_PATH
+)
+
+parser_nearest = subparsers.add_parser("nearest")
+parser_nearest.add_argument("latitude", type=float)
+parser_nearest.add_argument("longitude", type=float)
+parser_nearest.add_argument("-n", "--limit", type=int, default=10)
+parser_nearest.add_argument("-r", "--radius-km", type=float)
+
+parser_snapshot = subparsers.add_parser("snapshot")
+parser_snapshot.add_argument("path", type=pathlib.Path)
+
+upstream_parser = argparse.ArgumentParser(add_help=False)
+upstream_parser.add_argument(
+    "--fixtures",
+    type=pathlib.Path,
+    nargs="?",
+    const=pathlib.Path(__file__).parent / "tests" / "services",
+    help="serve upstream pages from fixtures (default tests/services) instead",
+)
+upstream_parser.add_argument(
+    "--latency", type=float, default=0.0, help="fixture upstream seconds"
+)
+
+parser_profile = subparsers.add_parser("profile", parents=[upstream_parser])
+parser_profile.add_argument("keyword")
+parser_profile.add_argument("-l", "--library-ids", action="append", required=True)
+parser_profile.add_argument(
+    "-p", "--profiler", choices=("sample", "cprofile"), default="sample"
+)
+parser_profile.add_argument("-n", "--repeat", type=int, default=1)
+parser_profile.add_argument("-i", "--interval", type=float, default=0.001)
+parser_profile.add_argument(
+    "-o",
+    "--output",
+    type=pathlib.Path,
+    help="folded stacks (sample) or pstats (cprofile) file",
+)
+
+parser_bench = subparsers.add_parser("bench", parents=[upstream_parser])
+parser_bench.add_argument(
+    "workload",
+    type=pathlib.Path,
+    help='JSON lines of {"term": ..., "library_ids": [...]}',
+)
+parser_bench.add_argument("-c", "--concurrency", type=int, default=4)
+parser_bench.add_argument("-n", "--repeat", type=int, default=1)
+
+
+class BenchContext:
+    def __init__(self) -> None:
+        self.trailing_metadata = {}
+
+    def invocation_metadata(self):
+        return (("x-client-id", "cli-bench"),)
+
+    def peer(self):
+        return "ipv4:127.0.0.1:0"
+
+    def set_trailing_metadata(self, metadata):
+        self.trailing_metadata = dict(metadata)
+
+    async def abort(self, code, details):
+        raise RuntimeError(f"{code.name}: {details}")
+
+
+@contextlib.asynccontextmanager
+async def upstreams(fixtures: pathlib.Path | None, latency: float):
+    if fixtures is None:
+        yield
+        return
+    # Benchmark-only dependencies stay out of every other command's startup.
+    from benchmarks.load import start_fake_upstreams
+
+    # Fixture libraries must not be geocoded against the real API.
+    os.environ.pop("KAKAO_API_KEY", None)
+    runners, overrides = await start_fake_upstreams(
+        latency, latency / 4, 0.0, random.Random(0), fixtures
+    )
+    http.UPSTREAM_OVERRIDES.update(overrides)
+    try:
+        yield
+    finally:
+        for runner in runners.values():
+            await runner.cleanup()
+
+
+async def search_once(resolver: Resolver, term: str, library_ids, context=None):
+    started_at = time.perf_counter()
+    first_entity = None
+    async for res in resolver.Search(
+        SearchRequest(library_ids=library_ids, term=term), context
+    ):
+        if first_entity is None:
+            first_entity = time.perf_counter() - started_at
+    return time.perf_counter() - started_at, first_entity
+
+
+async def profile(resolver: Resolver, args: argparse.Namespace) -> None:
+    # The first search loads the library lists and imports parsers.
+    await search_once(resolver, args.keyword, args.library_ids)
+    if args.profiler == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+    else:
+        profiler = StackSampler(args.interval)
+        profiler.start()
+    try:
+        for _ in range(args.repeat):
+            elapsed, _ = await search_once(resolver, args.keyword, args.library_ids)
+            print(f"search took {elapsed * 1000:.0f}ms")
+    finally:
+        if args.profiler == "cprofile":
+            profiler.disable()
+        else:
+            profiler.stop()
+
+    if args.profiler == "cprofile":
+        output = args.output or pathlib.Path("profile.pstats")
+        profiler.dump_stats(output)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
+    else:
+        output = args.output or pathlib.Path("profile.folded")
+        profiler.write_folded(output)
+        print(f"{sum(profiler.counts.values())} samples")
+    print(f"Profile written to {output}")
+
+
+async def bench(resolver: Resolver, args: argparse.Namespace) -> None:
+    workload = [
+        json.loads(line) for line in args.workload.read_text().splitlines() if line
+    ]
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def run(item: dict) -> dict:
+        async with semaphore:
+            context = BenchContext()
+            result = {}
+            try:
+                result["latency"], result["first_entity"] = await search_once(
+                    resolver, item["term"], item["library_ids"], context
+                )
+            except Exception as e:
+                result["error"] = str(e) or type(e).__name__
+            services = context.trailing_metadata.get("x-cost-service-ms", "")
+            result["services"] = {
+                name: float(ms) / 1000
+                for name, _, ms in (part.partition("=") for part in services.split(","))
+                if ms
+            }
+            return result
+
+    started_at = time.perf_counter()
+    results = await asyncio.gather(
+        *(run(item) for _ in range(args.repeat) for item in workload)
+    )
+    elapsed = time.perf_counter() - started_at
+
+    ok = [r for r in results if "error" not in r]
+    print(
+        f"{len(results)} searches in {elapsed:.1f}s "
+        f"({len(results) / elapsed:.1f}/s, concurrency {args.concurrency}), "
+        f"{len(results) - len(ok)} errors"
+    )
+    for name, values in (
+        ("latency", [r["latency"] for r in ok]),
+        ("first entity", [r["first_entity"] for r in ok if r["first_entity"]]),
+    ):
+        print(f"{name:24s} " + format_percentiles(values))
+    services = {}
+    for result in ok:
+        for name, seconds in result["services"].items():
+            services.setdefault(name, []).append(seconds)
+    for name, values in sorted(services.items()):
+        print(f"  {name:22s} " + format_percentiles(values))
+    for error in sorted({r["error"] for r in results if "error" in r}):
+        print(f"error: {error}")
+
+
+def format_percentiles(values: list[float]) -> str:
+    from benchmarks.load import percentiles
+
+    return f"n={len(values):<5d} " + " ".join(
+        f"{k}={v or 0:7.0f}ms" for k, v in percentiles(values).items()
+    )
+
 
 async def main():
     args = parser.parse_args()
     if args.debug:
         logging.basicConfig(level=logging.DEBUG)
+    if args.memory_profile:
+        logging.basicConfig()
+        logging.getLogger(memory.__name__).setLevel(logging.INFO)
+        memory.enable()
 
     resolver = Resolver()
 
@@ -49,6 +260,52 @@ async def main():
             if args.export:
                 with open(args.export, "wb") as f:
                     pickle.dump(entities, f)
+        case "gazetteer":
+            # Fresh library lists, geocoded without the current gazetteer; Kakao
+            # lookups still come from its cache for up to KAKAO_HIT_TTL.
+            libraries = [
+                library
+                for libraries in await asyncio.gather(
+                    *(service.fetch_libraries() for service in services.values())
+                )
+                for library in libraries
+            ]
+            gazetteer = Gazetteer.from_libraries(libraries)
+            gazetteer.dump(args.output)
+            print(
+                f"{len(gazetteer)} of {len(libraries)} libraries "
+                f"written to {args.output}"
+            )
+            for library in libraries:
+                if library.id not in gazetteer:
+                    print(f"missing coordinate: {library.id:16s} : {library.name}")
+        case "nearest":
+            names = {lib.id: lib.name for lib in await resolver.get_libraries()}
+            started_at = time.perf_counter()
+            nearest = await resolver.nearest_libraries(
+                args.latitude, args.longitude, args.limit, args.radius_km
+            )
+            elapsed = time.perf_counter() - started_at
+            for library_id, distance in nearest:
+                print(f"{library_id:24s} : {distance:6.2f}km  {names[library_id]}")
+            print(f"{len(nearest)} libraries in {elapsed * 1e6:.0f}us")
+        case "snapshot":
+            count = await export_snapshot(
+                args.path,
+                lambda: resolver.GetLibraries(GetLibrariesRequest(), None),
+            )
+            print(f"{count} entries written to {args.path}")
+        case "profile":
+            async with upstreams(args.fixtures, args.latency):
+                await profile(resolver, args)
+        case "bench":
+            async with upstreams(args.fixtures, args.latency):
+                await bench(resolver, args)
+
+    if memory.is_enabled():
+        memory.log_top_allocations()
+    await Kakao.shared().close()
+    await close_sessions()
 
 
 asyncio.run(main())
@@ -1,39 +1,103 @@
 import argparse
 import asyncio
 import concurrent.futures
+import logging
 import os
+import pathlib
 
 from grpc.aio import server as create_grpc_server
+from grpc_health.v1.health_pb2_grpc import add_HealthServicer_to_server
 from heekkr.resolver_pb2_grpc import add_ResolverServicer_to_server
-from sentry_sdk import init as init_sentry
 
-from app import Resolver
+from app import Resolver, configure_caches
+from app.core import services
+from app.utils import memory, metrics, tracing
+from app.utils.health import HealthReporter
+from app.utils.http import close_sessions
+from app.utils.introspection import memory_handler, state_handler
+from app.utils.kakao import Kakao
+from app.utils.snapshot import load_snapshot
+from app.utils.warmup import warm_up
 
 
 parser = argparse.ArgumentParser()
 parser.add_argument("-b", "--bind", type=str, default="[::]:50051")
+parser.add_argument(
+    "--snapshot",
+    type=pathlib.Path,
+    default=os.environ.get("CACHE_SNAPSHOT_PATH") or None,
+)
+parser.add_argument(
+    "--warmup-budget",
+    type=float,
+    default=float(os.environ.get("WARMUP_BUDGET", 0)),
+    help="seconds to spend warming up services before reporting SERVING",
+)
+parser.add_argument(
+    "--metrics-port",
+    type=int,
+    default=metrics.METRICS_PORT,
+    help="serve Prometheus metrics on 127.0.0.1:PORT/metrics and live state on "
+    "/debug/state (0 disables)",
+)
 
 
-async def serve(bind: str):
+async def serve(
+    bind: str,
+    snapshot: pathlib.Path | None = None,
+    warmup_budget: float = 0,
+    metrics_port: int = 0,
+):
+    if snapshot:
+        await load_snapshot(snapshot)
+
+    resolver = Resolver()
+    if metrics_port:
+        metrics.enable()
+        await metrics.start_metrics_server(
+            metrics_port,
+            routes=[
+                ("/debug/state", state_handler(resolver)),
+                ("/debug/memory", memory_handler()),
+            ],
+        )
+        print(f"Metrics served at 127.0.0.1:{metrics_port}/metrics")
+    resolver.loop_lag.start()
+    health = HealthReporter(resolver, services)
+    await health.update()
+
     server = create_grpc_server(concurrent.futures.ThreadPoolExecutor(max_workers=4))
-    add_ResolverServicer_to_server(Resolver(), server)
+    add_ResolverServicer_to_server(resolver, server)
+    add_HealthServicer_to_server(health.servicer, server)
     server.add_insecure_port(bind)
     await server.start()
     print(f"Server started at {bind}")
+
+    if warmup_budget > 0:
+        await warm_up(services, warmup_budget)
+    health.ready = True
+    health.start()
+
     await server.wait_for_termination()
+    await resolver.loop_lag.stop()
+    if memory.is_enabled():
+        memory.log_top_allocations()
+    await Kakao.shared().close()
+    await close_sessions()
 
 
 def main():
     args = parser.parse_args()
+    configure_caches()
 
+    if memory.MEMORY_PROFILE:
+        logging.basicConfig()
+        logging.getLogger(memory.__name__).setLevel(logging.INFO)
+        memory.enable()
     if dsn := os.environ.get("SENTRY_DSN"):
-        init_sentry(
-            dsn=dsn,
-            traces_sample_rate=1.0,
-            profiles_sample_rate=0.05,
-        )
+        tracing.init(dsn)
 
-    asyncio.run(serve(args.bind))
+    asyncio.run(serve(args.bind, args.snapshot, args.warmup_budget, args.metrics_port))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,13 @@
+import pytest
+
+from app import configure_caches
+from app.services.common.jnet import JnetSearcher
+from app.utils.gazetteer import Gazetteer
+
+
+configure_caches()
+
+
+@pytest.fixture(autouse=True)
+def empty_gazetteer(monkeypatch):
+    monkeypatch.setattr(JnetSearcher, "get_gazetteer", lambda self: Gazetteer())
@@ -0,0 +1,69 @@
+import os
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+
+HEAVY_MODULES = (
+    "openpyxl",
+    "bs4",
+    "lxml",
+    "google.cloud.storage",
+    "app.services.common.jnet",
+)
+CLI = pathlib.Path(__file__).parent.parent / "cli.py"
+IMPORT_BUDGET_US = int(os.environ.get("IMPORT_BUDGET_US", 150_000))
+# What run.py imports: grpc, aiohttp, sentry and the protobufs, without services.
+RESOLVER_IMPORT_BUDGET_US = int(os.environ.get("RESOLVER_IMPORT_BUDGET_US", 750_000))
+
+
+def import_times(statement: str) -> dict[str, int]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[12:].split("|"))
+        times[name] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize("statement", ["import app", "from app import Resolver"])
+def test_heavy_modules_are_lazy(statement):
+    times = import_times(statement)
+    assert not [name for name in HEAVY_MODULES if name in times]
+
+
+def test_import_budget():
+    times = import_times("import app")
+    assert times["app"] <= IMPORT_BUDGET_US
+
+
+def test_resolver_import_budget():
+    times = import_times("from app import Resolver")
+    assert times["app"] + times["app.resolver"] <= RESOLVER_IMPORT_BUDGET_US
+
+
+def test_services_are_imported_on_access():
+    times = import_times(
+        "from app.core import services; assert 'gdlib' in services"
+        "; assert 'seoul-gwanak' not in services"
+    )
+    assert "app.services.gdlib" not in times
+
+
+def test_cli_does_not_import_benchmarks():
+    # --help exits after the module level imports, before any command runs.
+    times = import_times(
+        f"import runpy, sys; sys.argv = ['cli.py', '--help']"
+        f"; sys.stdout = None; runpy.run_path({str(CLI)!r})"
+    )
+    assert "benchmarks" not in times
+    assert not [name for name in HEAVY_MODULES if name in times]
@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+import pytest
+
+from app.utils.admission import AdmissionController, Priority, Rejected
+from app.utils.looplag import LoopLagMonitor
+
+
+@pytest.mark.asyncio
+async def test_limits_concurrency_and_queue():
+    admission = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=1)
+    await admission.acquire()
+    waiter = asyncio.create_task(admission.acquire())
+    await asyncio.sleep(0)
+    assert admission.queued == 1
+
+    with pytest.raises(Rejected, match="full"):
+        await admission.acquire()
+
+    admission.release()
+    assert await waiter >= 0
+    assert admission.active == 1
+    admission.release()
+    assert admission.active == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_timeout():
+    admission = AdmissionController(max_concurrent=1, queue_timeout=0.05)
+    await admission.acquire()
+    with pytest.raises(Rejected, match="queued"):
+        await admission.acquire()
+    assert admission.queued == 0
+    admission.release()
+    assert admission.active == 0
+
+
+@pytest.mark.asyncio
+async def test_high_priority_first():
+    admission = AdmissionController(max_concurrent=1, queue_timeout=1)
+    await admission.acquire()
+    order = []
+
+    async def request(name, priority):
+        async with admission.admit(priority):
+            order.append(name)
+
+    low = asyncio.create_task(request("search", Priority.LOW))
+    await asyncio.sleep(0)
+    high = asyncio.create_task(request("libraries", Priority.HIGH))
+    await asyncio.sleep(0)
+    admission.release()
+    await asyncio.gather(low, high)
+    assert order == ["libraries", "search"]
+    assert admission.active == 0
+
+
+@pytest.mark.asyncio
+async def test_sheds_low_priority_under_load():
+    lag = 0.0
+    admission = AdmissionController(
+        max_concurrent=1, max_loop_lag=0.5, max_queue_delay=0.1, loop_lag=lambda: lag
+    )
+    lag = 1.0
+    with pytest.raises(Rejected, match="lag"):
+        await admission.acquire(Priority.LOW)
+    await admission.acquire(Priority.HIGH)
+
+    lag = 0.0
+    waiter = asyncio.create_task(admission.acquire(Priority.LOW))
+    await asyncio.sleep(0)
+    admission.queue_delay = 0.2
+    with pytest.raises(Rejected, match="delay"):
+        await admission.acquire(Priority.LOW)
+    admission.release()
+    await waiter
+    admission.release()
+    assert admission.counters["rejected"] == 2
+
+
+@pytest.mark.asyncio
+async def test_one_long_callback_does_not_shed_for_the_window():
+    monitor = LoopLagMonitor(interval=0.01, slow_callback_threshold=0)
+    admission = AdmissionController(loop_lag=lambda: monitor.smoothed)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.03)
+        time.sleep(0.5)  # one synchronous parse blocking the loop
+        await asyncio.sleep(0.03)
+        assert monitor.lag >= 0.4
+        await admission.acquire(Priority.LOW)
+        admission.release()
+    finally:
+        await monitor.stop()
+
+    for _ in range(20):
+        monitor.observe(1.5)
+    with pytest.raises(Rejected, match="lag"):
+        await admission.acquire(Priority.LOW)
@@ -0,0 +1,168 @@
+import asyncio
+import datetime
+import pickle
+
+import pytest
+
+from app.core import Coordinate, Library
+from app.utils.cache import (
+    BoundedMemoryCache,
+    CacheEntity,
+    SqliteCache,
+    cached_with_refresh,
+    dump_entity,
+    estimate_size,
+    load_entity,
+)
+
+
+def test_estimate_size_counts_nested_values():
+    library = Library(id="gdlib:MA", name="성내도서관")
+    located = Library(
+        id="gdlib:MA",
+        name="성내도서관",
+        coordinate=Coordinate(latitude=37.5, longitude=127.1),
+    )
+    assert estimate_size(located) > estimate_size(library)
+    assert estimate_size([library, library]) < 2 * estimate_size(library) + 100
+
+
+@pytest.mark.asyncio
+async def test_bounded_memory_cache_evicts_least_recently_used():
+    value = "x" * 100
+    cache = BoundedMemoryCache(max_bytes=estimate_size(value) * 3)
+    await cache.set("a", value)
+    await cache.set("b", value)
+    await cache.set("c", value)
+    assert await cache.get("a") == value
+
+    await cache.set("d", value)
+    assert await cache.get("b") is None
+    assert await cache.get("a") == value
+    assert await cache.get("d") == value
+    assert cache.stats()["entries"] == 3
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+
+@pytest.mark.asyncio
+async def test_bounded_memory_cache_max_entries():
+    cache = BoundedMemoryCache(max_entries=2)
+    for key in "abc":
+        await cache.set(key, key)
+    assert await cache.exists("a") is False
+    assert await cache.get("c") == "c"
+
+
+@pytest.mark.asyncio
+async def test_bounded_memory_cache_rejects_oversized_value():
+    cache = BoundedMemoryCache(max_bytes=64)
+    assert await cache.set("big", "x" * 1024) is False
+    assert await cache.get("big") is None
+    assert cache.stats()["rejections"] == 1
+
+
+@pytest.mark.asyncio
+async def test_bounded_memory_cache_tinylfu_keeps_frequent_entries():
+    value = "x" * 100
+    cache = BoundedMemoryCache(max_bytes=estimate_size(value) * 2, policy="tinylfu")
+    await cache.set("hot", value)
+    await cache.set("warm", value)
+    for _ in range(5):
+        await cache.get("hot")
+        await cache.get("warm")
+
+    assert await cache.set("cold", value) is False
+    assert await cache.get("hot") == value
+    assert await cache.get("warm") == value
+
+
+@pytest.mark.asyncio
+async def test_bounded_memory_cache_expires_by_ttl():
+    cache = BoundedMemoryCache()
+    await cache.set("key", "value", ttl=0.01)
+    assert await cache.get("key") == "value"
+    await cache.expire("key", -1)
+    assert await cache.get("key") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_gcs_entity_frames_serialized_bytes():
+    expires_at = datetime.datetime(2023, 9, 1, 12, 30)
+    data = dump_entity(CacheEntity(value=b"payload", expires_at=expires_at))
+    assert data.endswith(b"payload")
+    assert load_entity(data) == CacheEntity(value=b"payload", expires_at=expires_at)
+    assert load_entity(pickle.dumps(CacheEntity(value=1, expires_at=None))) == (
+        CacheEntity(value=1, expires_at=None)
+    )
+
+
+@pytest.mark.asyncio
+async def test_cached_with_refresh_runs_single_refresher():
+    calls = 0
+
+    @cached_with_refresh(ttl=60)
+    async def load() -> list[str]:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return ["gdlib:MA"]
+
+    res = await asyncio.gather(*(load() for _ in range(10)))
+    assert res == [["gdlib:MA"]] * 10
+    assert calls == 1
+    assert await load() == ["gdlib:MA"]
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_with_refresh_serves_stale_value_while_refreshing():
+    version = 0
+
+    @cached_with_refresh(ttl=0.01, stale_ttl=60)
+    async def load() -> int:
+        nonlocal version
+        version += 1
+        await asyncio.sleep(0.01)
+        return version
+
+    assert await load() == 1
+    await asyncio.sleep(0.02)
+    assert await load() == 1
+    await asyncio.sleep(0.02)
+    assert await load() == 2
+
+
+@pytest.mark.asyncio
+async def test_sqlite_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    libraries = [Library(id="gdlib:MA", name="성내도서관")]
+
+    cache = SqliteCache(path=path)
+    await cache.set("libraries", libraries)
+    await cache.set("expired", "value", ttl=60)
+    await cache.expire("expired", -1)
+    await cache.close()
+
+    cache = SqliteCache(path=path)
+    assert await cache.get("libraries") == libraries
+    assert await cache.get("expired") is None
+    assert await cache.exists("libraries") is True
+    with pytest.raises(ValueError):
+        await cache.add("libraries", [])
+    await cache.add("expired", "fresh")
+    assert await cache.get("expired") == "fresh"
+    assert await cache.delete("libraries") == 1
+    assert await cache.get("libraries") is None
+    await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_cache_vacuum_removes_expired_rows(tmp_path):
+    cache = SqliteCache(path=str(tmp_path / "cache.sqlite3"), vacuum_interval=None)
+    await cache.set("a", "value", ttl=60)
+    await cache.set("b", "value")
+    await cache.expire("a", -1)
+    assert await cache._run(cache._vacuum_sync) == 1
+    assert await cache.get("b") == "value"
+    await cache.close()
@@ -0,0 +1,64 @@
+import pytest
+from heekkr.resolver_pb2 import GetLibrariesRequest, SearchEntity, SearchRequest
+
+import app.resolver
+from app.core import Library, Service
+from app.resolver import Resolver
+from app.utils.cost import parse_cpu, record_cache
+
+
+class FakeService(Service):
+    async def get_libraries(self):
+        return [Library(id="fake:1", name="Fake")]
+
+    async def search(self, keyword, library_ids):
+        record_cache(False)
+        with parse_cpu():
+            sum(range(10000))
+        yield SearchEntity()
+        yield SearchEntity()
+
+
+class FakeContext:
+    def __init__(self) -> None:
+        self.trailing_metadata = None
+
+    def invocation_metadata(self):
+        return (("x-client-id", "test"),)
+
+    def peer(self):
+        return "ipv4:127.0.0.1:1234"
+
+    def set_trailing_metadata(self, metadata):
+        self.trailing_metadata = dict(metadata)
+
+
+@pytest.fixture
+def resolver(monkeypatch):
+    monkeypatch.setattr(app.resolver, "services", {"fake": FakeService()})
+    return Resolver()
+
+
+@pytest.mark.asyncio
+async def test_search_cost_in_trailing_metadata(resolver, caplog):
+    context = FakeContext()
+    caplog.set_level("INFO", logger="app.utils.cost")
+    request = SearchRequest(term="어린왕자", library_ids=["fake:1"])
+    responses = [r async for r in resolver.Search(request, context)]
+
+    assert len(responses) == 2
+    cost = context.trailing_metadata
+    assert cost["x-cost-cache-misses"] == "1"
+    assert cost["x-cost-upstream-requests"] == "0"
+    assert float(cost["x-cost-parse-cpu-ms"]) >= 0
+    assert cost["x-cost-service-ms"].startswith("fake=")
+    (line,) = [r.message for r in caplog.records if "request_cost" in r.message]
+    assert '"client": "test"' in line
+    assert '"term": "어린왕자"' in line
+
+
+@pytest.mark.asyncio
+async def test_get_libraries_cost(resolver):
+    context = FakeContext()
+    await resolver.GetLibraries(GetLibrariesRequest(), context)
+    assert context.trailing_metadata["x-cost-upstream-requests"] == "0"
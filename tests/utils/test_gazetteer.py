@@ -0,0 +1,61 @@
+import pytest
+
+from app.core import Coordinate, Library
+from app.utils.gazetteer import GAZETTEER_VERSION, Gazetteer
+from app.utils.kakao import Address, Kakao
+
+from ..services.test_gdlib import Searcher as FixtureSearcher
+
+
+def test_gazetteer_round_trip(tmp_path):
+    path = tmp_path / "gazetteer.json"
+    gazetteer = Gazetteer.from_libraries(
+        [
+            Library(id="gdlib:MA", name="성내도서관"),
+            Library(
+                id="gdlib:BR",
+                name="해공도서관",
+                coordinate=Coordinate(latitude=37.53, longitude=127.12),
+            ),
+        ]
+    )
+    gazetteer.dump(path)
+
+    loaded = Gazetteer.load(path)
+    assert "gdlib:MA" not in loaded
+    assert loaded.get("gdlib:BR") == Coordinate(latitude=37.53, longitude=127.12)
+
+    path.write_text(f'{{"version": {GAZETTEER_VERSION + 1}, "libraries": {{}}}}')
+    assert len(Gazetteer.load(path)) == 0
+    assert len(Gazetteer.load(tmp_path / "missing.json")) == 0
+
+
+@pytest.mark.asyncio
+async def test_get_libraries_geocodes_only_missing_libraries(monkeypatch):
+    queries = []
+
+    async def search_keywords(self, keywords) -> list[Address | None]:
+        keywords = list(keywords)
+        queries.extend(keywords)
+        return [Address(x=127.0, y=37.0) for _ in keywords]
+
+    monkeypatch.setattr(Kakao, "search_keywords", search_keywords)
+
+    class Searcher(FixtureSearcher):
+        def get_gazetteer(self) -> Gazetteer:
+            return Gazetteer({"gdlib:MA": Coordinate(latitude=37.53, longitude=127.13)})
+
+    res = await Searcher()._get_libraries()
+    assert res[0] == Library(
+        id="gdlib:MA",
+        name="성내도서관",
+        coordinate=Coordinate(latitude=37.53, longitude=127.13),
+    )
+    assert res[1].coordinate == Coordinate(latitude=37.0, longitude=127.0)
+    assert "성내도서관" not in queries
+    assert len(queries) == len(res) - 1
+
+    queries.clear()
+    res = await Searcher().fetch_libraries()
+    assert res[0].coordinate == Coordinate(latitude=37.0, longitude=127.0)
+    assert len(queries) == len(res)
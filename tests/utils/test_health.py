@@ -0,0 +1,59 @@
+import pytest
+
+from app.utils.health import NOT_SERVING, RESOLVER_SERVICE, SERVING, HealthReporter
+from app.utils.looplag import LoopLagMonitor
+from app.utils.upstream import UpstreamTracker
+
+
+class FakeResolver:
+    def __init__(self) -> None:
+        self.loop_lag = LoopLagMonitor()
+        self.upstreams = UpstreamTracker()
+        self.inflight_searches = 0
+
+
+@pytest.mark.asyncio
+async def test_health_follows_readiness_and_load():
+    resolver = FakeResolver()
+    health = HealthReporter(
+        resolver, ["gdlib"], max_loop_lag=0.5, max_inflight_searches=2
+    )
+
+    await health.update()
+    assert health.statuses[""] == health.statuses[RESOLVER_SERVICE] == NOT_SERVING
+    assert health.reason == "warming up"
+
+    health.ready = True
+    await health.update()
+    assert health.statuses[""] == SERVING
+
+    resolver.inflight_searches = 2
+    await health.update()
+    assert health.statuses[""] == NOT_SERVING
+
+    resolver.inflight_searches = 0
+    resolver.loop_lag.samples.append(1.0)
+    await health.update()
+    assert health.statuses[""] == NOT_SERVING
+    assert "lag" in health.reason
+
+
+@pytest.mark.asyncio
+async def test_upstream_sub_status():
+    resolver = FakeResolver()
+    health = HealthReporter(
+        resolver, ["gdlib", "sblib"], min_samples=3, max_upstream_latency=5
+    )
+    for _ in range(3):
+        resolver.upstreams.record("gdlib", False, 0.1)
+        resolver.upstreams.record("sblib", True, 0.1)
+    resolver.upstreams.record("seoul-mapo", True, 30)
+
+    statuses = health.compute()
+    assert statuses["gdlib"] == NOT_SERVING
+    assert statuses["sblib"] == SERVING
+
+    health.service_names.append("seoul-mapo")
+    for _ in range(3):
+        resolver.upstreams.record("seoul-mapo", True, 30)
+    assert health.compute()["seoul-mapo"] == NOT_SERVING
@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+import pytest
+from heekkr.resolver_pb2 import SearchEntity, SearchRequest
+
+import app.resolver
+from app.core import Library, Service
+from app.resolver import Resolver
+from app.utils.introspection import state, state_handler
+
+
+class SlowService(Service):
+    def __init__(self) -> None:
+        self.release = asyncio.Event()
+
+    async def get_libraries(self):
+        return [Library(id="slow:1", name="Slow")]
+
+    async def search(self, keyword, library_ids):
+        yield SearchEntity()
+        await self.release.wait()
+        yield SearchEntity()
+
+
+@pytest.fixture
+def service(monkeypatch):
+    service = SlowService()
+    monkeypatch.setattr(app.resolver, "services", {"slow": service})
+    return service
+
+
+@pytest.mark.asyncio
+async def test_state_lists_inflight_searches(service):
+    resolver = Resolver()
+    request = SearchRequest(term="어린왕자", library_ids=["slow:1"])
+    responses = resolver.Search(request, None)
+    await responses.__anext__()
+
+    (search,) = state(resolver)["searches"]
+    assert search["term"] == "어린왕자"
+    assert search["stage"] == "running"
+    assert search["entities"] == 1
+    assert search["services"] == {"slow": "streaming"}
+    assert resolver.inflight_searches == 1
+
+    service.release.set()
+    assert len([r async for r in responses]) == 1
+    assert state(resolver)["searches"] == []
+    assert resolver.inflight_searches == 0
+
+
+@pytest.mark.asyncio
+async def test_state_reports_library_tables(service):
+    resolver = Resolver()
+    await resolver.get_libraries()
+    libraries = state(resolver)["libraries"]
+    assert libraries["services"]["slow"]["size"] == 1
+    assert libraries["updated_at"] is not None
+    assert "default" in state(resolver)["caches"]
+
+
+@pytest.mark.asyncio
+async def test_state_handler_serves_json(service):
+    response = await state_handler(Resolver())(None)
+    body = json.loads(response.body)
+    assert body["searches"] == []
+    assert "admission" in body
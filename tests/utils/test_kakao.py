@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+from aiocache import caches
+from aiohttp import ClientError
+
+from app.utils.kakao import Address, DailyQuota, Kakao, KakaoError, QuotaExhausted
+from app.utils.ratelimit import TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_search_keywords_dedupes_concurrent_queries(monkeypatch):
+    calls = []
+
+    async def search_keyword(self, keyword: str) -> Address | None:
+        calls.append(keyword)
+        await asyncio.sleep(0.01)
+        return Address(x=len(keyword), y=0) if keyword != "없음" else None
+
+    monkeypatch.setattr(Kakao, "search_keyword", search_keyword)
+
+    async with Kakao() as a, Kakao() as b:
+        res_a, res_b = await asyncio.gather(
+            a.search_keywords(["성내도서관", "없음", "강일도서관"]),
+            b.search_keywords(["강일도서관", "암사도서관"]),
+        )
+
+    assert res_a == [Address(x=5, y=0), None, Address(x=5, y=0)]
+    assert res_b == [Address(x=5, y=0), Address(x=5, y=0)]
+    assert sorted(calls) == sorted(["성내도서관", "없음", "강일도서관", "암사도서관"])
+
+
+@pytest.mark.asyncio
+async def test_kakao_degrades_until_quota_resets(monkeypatch):
+    kakao = Kakao(key="test", daily_quota=10, quota_reserve=0.2)
+    day = "test_kakao:quota:1"
+    kakao.quota._key = lambda: day
+    kakao.quota.day, kakao.quota.used = day, 8
+    calls = []
+
+    def get(*args, **kwargs):
+        calls.append(args)
+        raise ClientError("offline")
+
+    async with kakao:
+        monkeypatch.setattr(kakao.session, "get", get)
+        assert await kakao.search_keyword("test_kakao:quota") is None
+        assert kakao.stats()["quota_exhausted"] == 1
+        assert calls == []
+
+        day = "test_kakao:quota:2"
+        with pytest.raises(KakaoError) as e:
+            await kakao._request("/v2/local/search/keyword.json", {})
+        assert not isinstance(e.value, QuotaExhausted)
+        assert len(calls) == 1
+        assert kakao.quota.used == 1
+    await caches.get("default").delete(day)
+
+
+@pytest.mark.asyncio
+async def test_kakao_caches_outcomes_with_separate_ttls(monkeypatch):
+    responses = {
+        "성내도서관": Address(x=127.13, y=37.53),
+        "없는도서관": None,
+        "오류도서관": KakaoError("Request timed out"),
+    }
+    ttls = {}
+
+    async def fetch(self, keyword: str) -> Address | None:
+        if isinstance(res := responses[keyword], Exception):
+            raise res
+        return res
+
+    cache = caches.get("default")
+    set_ = cache.set
+
+    async def set(key, value, ttl=None, **kwargs):
+        ttls[key] = ttl
+        return await set_(key, value, ttl=ttl, **kwargs)
+
+    monkeypatch.setattr(Kakao, "_fetch_keyword", fetch)
+    monkeypatch.setattr(cache, "set", set)
+    kakao = Kakao(key="test", hit_ttl=300, miss_ttl=200, error_ttl=100)
+    for _ in range(2):
+        assert await kakao.search_keyword("성내도서관") == Address(x=127.13, y=37.53)
+        assert await kakao.search_keyword("없는도서관") is None
+        assert await kakao.search_keyword("오류도서관") is None
+
+    assert ttls == {
+        "kakao:keyword:성내도서관": 300,
+        "kakao:keyword:없는도서관": 200,
+        "kakao:keyword:오류도서관": 100,
+    }
+    stats = kakao.stats()
+    assert [stats["hit"], stats["miss"], stats["error"]] == [1, 1, 1]
+    assert [stats["cached_hit"], stats["cached_miss"], stats["cached_error"]] == [
+        1,
+        1,
+        1,
+    ]
+    for key in ttls:
+        await cache.delete(key)
+
+
+@pytest.mark.asyncio
+async def test_daily_quota_counts_requests(caplog):
+    quota = DailyQuota(3, alias="default")
+    quota._key = lambda: "test_kakao:quota"
+    try:
+        assert [await quota.acquire() for _ in range(4)] == [True, True, True, False]
+        assert quota.exhausted
+        assert caplog.text.count("resets on restart") == 1
+    finally:
+        await caches.get("default").delete("test_kakao:quota")
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=100, burst=2)
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert await bucket.acquire() > 0
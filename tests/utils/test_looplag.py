@@ -0,0 +1,51 @@
+import asyncio
+import time
+
+import pytest
+
+from app.utils.looplag import LoopLagMonitor
+
+
+def block_loop(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+@pytest.mark.asyncio
+async def test_records_lag_and_slow_callbacks():
+    monitor = LoopLagMonitor(interval=0.01, slow_callback_threshold=0.05)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.03)
+
+        async def blocker():
+            block_loop(0.2)
+
+        await asyncio.create_task(blocker(), name="blocker")
+        await asyncio.sleep(0.03)
+    finally:
+        await monitor.stop()
+
+    assert monitor.lag >= 0.1
+    (record,) = [r for r in monitor.slow_callbacks.records if "blocker" in r.callback]
+    assert record.duration >= 0.2
+    assert "block_loop" in record.stack
+
+
+@pytest.mark.asyncio
+async def test_slow_callbacks_can_be_disabled():
+    monitor = LoopLagMonitor(interval=0.01, slow_callback_threshold=0)
+    monitor.start()
+    await asyncio.sleep(0.02)
+    await monitor.stop()
+    assert monitor.slow_callbacks is None
+    assert monitor.samples
+
+
+@pytest.mark.asyncio
+async def test_slow_callbacks_are_opt_in():
+    run = asyncio.Handle._run
+    monitor = LoopLagMonitor(interval=0.01)
+    monitor.start()
+    assert asyncio.Handle._run is run
+    await monitor.stop()
+    assert monitor.slow_callbacks is None
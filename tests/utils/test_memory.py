@@ -0,0 +1,51 @@
+import json
+
+import pytest
+from heekkr.resolver_pb2 import SearchRequest
+
+import app.resolver
+from app.resolver import Resolver
+from app.utils import memory
+from tests.services.test_sblib import Searcher
+from tests.utils.test_cost import FakeContext
+
+
+class SblibService:
+    def __init__(self) -> None:
+        self.searcher = Searcher()
+
+    async def get_libraries(self):
+        return await self.searcher.get_libraries()
+
+    def search(self, keyword, library_ids):
+        return self.searcher.search(keyword, library_ids)
+
+
+@pytest.fixture
+def tracing():
+    memory.enable()
+    yield
+    memory.disable()
+
+
+@pytest.mark.asyncio
+async def test_search_memory_profile(monkeypatch, tracing, caplog):
+    monkeypatch.setattr(app.resolver, "services", {"sblib": SblibService()})
+    caplog.set_level("INFO", logger=memory.__name__)
+    request = SearchRequest(term="편의점", library_ids=["sblib:BR"])
+    responses = [r async for r in Resolver().Search(request, FakeContext())]
+    assert len(responses) == 10
+
+    (line,) = [r.message for r in caplog.records if "memory_profile" in r.message]
+    profile = json.loads(line)
+    assert profile["term"] == "편의점"
+    assert profile["peak_kib"] > 0
+    assert profile["stages"]["sblib.parse"]["peak_kib"] > 0
+    assert profile["stages"]["sblib.export"]["calls"] == 1
+    assert memory.top_allocations(3)
+
+
+def test_tracked_is_noop_without_profile():
+    with memory.tracked("sblib", "parse"):
+        pass
+    assert memory.top_allocations() == []
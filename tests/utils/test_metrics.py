@@ -0,0 +1,62 @@
+import contextlib
+
+import pytest
+
+from app.utils import metrics
+from app.utils.metrics import Histogram, Registry
+from tests.services.test_sblib import Searcher as SblibSearcher
+
+
+@pytest.fixture
+def enabled_metrics():
+    metrics.enable()
+    metrics.stage_seconds.series.clear()
+    yield metrics.stage_seconds
+    metrics.disable()
+    metrics.stage_seconds.series.clear()
+
+
+def test_histogram_renders_prometheus_text():
+    registry = Registry()
+    histogram = registry.register(
+        Histogram("test_seconds", "Test.", ("service",), buckets=(0.1, 1.0))
+    )
+    histogram.observe(0.05, "gdlib")
+    histogram.observe(0.5, "gdlib")
+    histogram.observe(5, 'quo"te')
+
+    assert registry.render().splitlines() == [
+        "# HELP test_seconds Test.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{service="gdlib",le="0.1"} 1',
+        'test_seconds_bucket{service="gdlib",le="1.0"} 2',
+        'test_seconds_bucket{service="gdlib",le="+Inf"} 2',
+        'test_seconds_sum{service="gdlib"} 0.55',
+        'test_seconds_count{service="gdlib"} 2',
+        'test_seconds_bucket{service="quo\\"te",le="0.1"} 0',
+        'test_seconds_bucket{service="quo\\"te",le="1.0"} 0',
+        'test_seconds_bucket{service="quo\\"te",le="+Inf"} 1',
+        'test_seconds_sum{service="quo\\"te"} 5',
+        'test_seconds_count{service="quo\\"te"} 1',
+    ]
+
+
+def test_disabled_timer_is_a_no_op():
+    assert isinstance(metrics.timed("gdlib", "fetch"), contextlib.nullcontext)
+
+
+@pytest.mark.asyncio
+async def test_search_stages_are_timed(enabled_metrics):
+    async for _ in SblibSearcher().search("", []):
+        pass
+    stages = {stage for service, stage in enabled_metrics.series if service == "sblib"}
+    assert {"fetch", "parse", "export", "match", "build"} <= stages
+
+
+@pytest.mark.asyncio
+async def test_library_cache_is_timed_per_service(enabled_metrics):
+    await SblibSearcher().get_libraries()
+    assert ("sblib", "cache_get") in enabled_metrics.series
+    assert not [
+        service for service, _ in enabled_metrics.series if service == "default"
+    ]
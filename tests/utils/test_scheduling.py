@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from app.utils.scheduling import ClientInfo, FairScheduler, client_from_context
+
+
+class FakeContext:
+    def __init__(self, metadata=(), peer="ipv4:10.0.0.1:53211") -> None:
+        self.metadata = metadata
+        self._peer = peer
+
+    def invocation_metadata(self):
+        return self.metadata
+
+    def peer(self):
+        return self._peer
+
+
+def test_client_from_context():
+    assert client_from_context(FakeContext()) == ClientInfo("ipv4:10.0.0.1")
+    assert client_from_context(
+        FakeContext((("x-client-id", "batch"), ("x-priority", "bulk")))
+    ) == ClientInfo("batch", "bulk")
+    assert (
+        client_from_context(FakeContext((("x-priority", "urgent"),))).priority
+        == "interactive"
+    )
+
+
+async def run_requests(scheduler, requests):
+    order = []
+
+    async def request(client, name):
+        async with scheduler.slot(client):
+            order.append(name)
+            await asyncio.sleep(0)
+
+    # Occupy the only slot so every request below has to queue.
+    await scheduler.acquire(ClientInfo("warm"))
+    tasks = []
+    for client, name in requests:
+        tasks.append(asyncio.create_task(request(client, name)))
+        await asyncio.sleep(0)
+    scheduler.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+@pytest.mark.asyncio
+async def test_interactive_client_is_not_stuck_behind_bulk_backlog():
+    bulk = ClientInfo("batch", "bulk")
+    user = ClientInfo("user")
+    order = await run_requests(
+        FairScheduler(concurrency=1),
+        [(bulk, f"bulk{i}") for i in range(10)] + [(user, "user")],
+    )
+    assert order.index("user") <= 1
+    assert order[-1] == "bulk9"
+
+
+@pytest.mark.asyncio
+async def test_equal_weights_alternate():
+    a, b = ClientInfo("a"), ClientInfo("b")
+    order = await run_requests(
+        FairScheduler(concurrency=1),
+        [(a, "a1"), (a, "a2"), (a, "a3"), (b, "b1"), (b, "b2"), (b, "b3")],
+    )
+    assert order == ["a1", "b1", "a2", "b2", "a3", "b3"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_slot():
+    scheduler = FairScheduler(concurrency=1)
+    await scheduler.acquire(ClientInfo("a"))
+    waiter = asyncio.create_task(scheduler.acquire(ClientInfo("b")))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    scheduler.release()
+    assert scheduler.active == 0
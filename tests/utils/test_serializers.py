@@ -0,0 +1,94 @@
+import pickle
+import subprocess
+import sys
+
+from heekkr.book_pb2 import Book, PublishDate
+from heekkr.holding_pb2 import AvailableStatus, HoldingStatus, HoldingSummary
+from heekkr.resolver_pb2 import SearchEntity
+
+from app.core import Coordinate, Library
+from app.utils.serializers import HEADER, MAGIC, CompactSerializer
+
+
+LIBRARIES = [
+    Library(
+        id=f"gdlib:M{i}",
+        name=f"{i}번도서관",
+        coordinate=Coordinate(latitude=37.5 + i / 1000, longitude=127.1)
+        if i % 2
+        else None,
+    )
+    for i in range(100)
+]
+
+ENTITY = SearchEntity(
+    book=Book(
+        isbn="9791192579887",
+        title="바다가 들리는 편의점. 2",
+        author="마치다 소노코 지음 ; 황국영 옮김",
+        publisher="모모",
+        publish_date=PublishDate(year=2023),
+    ),
+    holding_summaries=[
+        HoldingSummary(
+            call_number="833.6-마86ㅂ-2",
+            library_id="gdlib:BR",
+            location="해공종합자료실",
+            status=HoldingStatus(
+                available=AvailableStatus(detail="비치중"),
+                requests_available=False,
+            ),
+        )
+    ],
+    url="https://gdlibrary.or.kr/",
+)
+
+
+def test_compact_serializer_round_trip_libraries():
+    serializer = CompactSerializer()
+    data = serializer.dumps(LIBRARIES)
+    assert data.startswith(MAGIC)
+    assert serializer.loads(data) == LIBRARIES
+    assert len(data) < len(pickle.dumps(LIBRARIES))
+
+
+def test_compact_serializer_round_trip_protobuf():
+    serializer = CompactSerializer(compression=None)
+    assert serializer.loads(serializer.dumps([ENTITY, None])) == [ENTITY, None]
+
+
+def test_compact_serializer_loads_protobuf_before_its_module_is_imported():
+    # A fresh interpreter, as when a snapshot loads before any service module.
+    script = (
+        "import sys; from app.utils.serializers import CompactSerializer"
+        "; assert 'heekkr.resolver_pb2' not in sys.modules"
+        "; (entity,) = CompactSerializer().loads(sys.stdin.buffer.read())"
+        "; print(entity.book.title)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        input=CompactSerializer().dumps([ENTITY]),
+        capture_output=True,
+        check=True,
+    )
+    assert result.stdout.decode().strip() == ENTITY.book.title
+
+
+def test_compact_serializer_compresses_above_threshold():
+    serializer = CompactSerializer(compress_threshold=1024)
+    _, _, small_codec = HEADER.unpack_from(serializer.dumps(LIBRARIES[:1]))
+    _, _, large_codec = HEADER.unpack_from(serializer.dumps(LIBRARIES))
+    assert small_codec == 0
+    assert large_codec != 0
+
+
+def test_compact_serializer_reads_legacy_pickle():
+    serializer = CompactSerializer()
+    assert serializer.loads(pickle.dumps(LIBRARIES)) == LIBRARIES
+
+
+def test_compact_serializer_ignores_unknown_schema_version():
+    serializer = CompactSerializer()
+    data = serializer.dumps(LIBRARIES)
+    data = HEADER.pack(MAGIC, 255, 0) + data[HEADER.size :]
+    assert serializer.loads(data) is None
@@ -0,0 +1,107 @@
+import pytest
+from aiocache import caches
+
+from app.core import Coordinate, Library
+from app.utils import snapshot
+from app.utils.cache import cached_with_refresh
+from app.utils.snapshot import SNAPSHOT_VERSION, export_snapshot, load_snapshot
+from app.utils.serializers import CompactSerializer
+
+
+LIBRARIES = [
+    Library(
+        id="gdlib:MA",
+        name="성내도서관",
+        coordinate=Coordinate(latitude=37.53, longitude=127.13),
+    )
+]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_round_trip(tmp_path):
+    path = tmp_path / "cache.snapshot"
+    cache = caches.get("default")
+
+    async def warm():
+        await cache.set("test_snapshot:libraries", LIBRARIES, ttl=60)
+
+    assert await export_snapshot(path, warm) == 1
+    assert cache.plugins == []
+
+    await cache.delete("test_snapshot:libraries")
+    assert await load_snapshot(path) == 1
+    assert await cache.get("test_snapshot:libraries") == LIBRARIES
+    assert await load_snapshot(path) == 0
+    await cache.delete("test_snapshot:libraries")
+
+
+@pytest.mark.parametrize("alias", ["default", "test_snapshot_sqlite"])
+@pytest.mark.asyncio
+async def test_snapshot_exports_an_already_warm_cache(tmp_path, alias):
+    caches.add(
+        "test_snapshot_sqlite",
+        {
+            "cache": "app.utils.cache.SqliteCache",
+            "path": str(tmp_path / "cache.sqlite3"),
+            "vacuum_interval": None,
+        },
+    )
+    calls = []
+
+    @cached_with_refresh(ttl=60, alias=alias, key="test_snapshot:warm")
+    async def get_libraries():
+        calls.append(1)
+        return LIBRARIES
+
+    # Warmed by an earlier request (or a previous process, for SQLite).
+    await get_libraries()
+    path = tmp_path / "cache.snapshot"
+    assert await export_snapshot(path, get_libraries, alias=alias) == 1
+    assert calls == [1]
+
+    cache = caches.get(alias)
+    await cache.delete("test_snapshot:warm")
+    assert await load_snapshot(path, alias=alias) == 1
+    assert await get_libraries() == LIBRARIES
+    assert calls == [1]
+    await cache.delete("test_snapshot:warm")
+    await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_snapshot_loads_only_the_remaining_ttl(tmp_path, monkeypatch):
+    path = tmp_path / "cache.snapshot"
+    cache = caches.get("default")
+
+    async def warm():
+        await cache.set("test_snapshot:fresh", LIBRARIES, ttl=100)
+        await cache.set("test_snapshot:stale", LIBRARIES, ttl=10)
+
+    now = snapshot.time.time()
+    monkeypatch.setattr(snapshot.time, "time", lambda: now)
+    assert await export_snapshot(path, warm) == 2
+    for key in ("test_snapshot:fresh", "test_snapshot:stale"):
+        await cache.delete(key)
+
+    ttls = {}
+    set_ = cache.set
+
+    async def set(key, value, ttl=None, **kwargs):
+        ttls[key] = ttl
+        return await set_(key, value, ttl=ttl, **kwargs)
+
+    monkeypatch.setattr(cache, "set", set)
+    monkeypatch.setattr(snapshot.time, "time", lambda: now + 40)
+    assert await load_snapshot(path) == 1
+    assert ttls == {"test_snapshot:fresh": pytest.approx(60)}
+    await cache.delete("test_snapshot:fresh")
+
+
+@pytest.mark.asyncio
+async def test_snapshot_ignores_other_versions(tmp_path):
+    path = tmp_path / "cache.snapshot"
+    path.write_bytes(
+        CompactSerializer().dumps({"version": SNAPSHOT_VERSION + 1, "entries": []})
+    )
+    assert await load_snapshot(path) == 0
+    assert await load_snapshot(tmp_path / "missing.snapshot") == 0
@@ -0,0 +1,154 @@
+import random
+import time
+
+import grpc
+import pytest
+from heekkr.resolver_pb2 import GetLibrariesRequest
+
+import app.resolver
+from app.core import Coordinate, Library, Service
+from app.resolver import Resolver, parse_near_metadata
+from app.utils.spatial import GridIndex, LibraryIndex, haversine_km
+
+
+def test_haversine_km():
+    # Seoul City Hall -> Gangnam Station
+    assert 8.5 < haversine_km(37.5663, 126.9779, 37.4979, 127.0276) < 9.0
+    assert haversine_km(37.5, 127.0, 37.5, 127.0) == 0
+
+
+def test_grid_index_matches_brute_force():
+    rng = random.Random(42)
+    points = [
+        (f"lib:{i}", 37.4 + rng.random() * 0.3, 126.8 + rng.random() * 0.4)
+        for i in range(300)
+    ]
+    index = GridIndex(points)
+    for _ in range(20):
+        lat, lng = 37.3 + rng.random() * 0.5, 126.7 + rng.random() * 0.6
+        expected = sorted(
+            (haversine_km(lat, lng, plat, plng), library_id)
+            for library_id, plat, plng in points
+        )
+        assert [library_id for library_id, _ in index.nearest(lat, lng, 5)] == [
+            library_id for _, library_id in expected[:5]
+        ]
+        assert [library_id for library_id, _ in index.nearest(lat, lng, None, 3)] == [
+            library_id for distance, library_id in expected if distance <= 3
+        ]
+
+
+def test_grid_index_far_outside():
+    rng = random.Random(7)
+    points = [
+        (f"lib:{i}", 37.4 + rng.random() * 0.3, 126.8 + rng.random() * 0.4)
+        for i in range(100)
+    ]
+    index = GridIndex(points)
+    for lat, lng in ((0.0, 0.0), (33.0, 126.0), (-37.5, -53.0), (-89.9, 179.9)):
+        started_at = time.perf_counter()
+        expected = sorted(
+            (haversine_km(lat, lng, plat, plng), library_id)
+            for library_id, plat, plng in points
+        )
+        assert [library_id for library_id, _ in index.nearest(lat, lng, 5)] == [
+            library_id for _, library_id in expected[:5]
+        ]
+        assert index.nearest(lat, lng, None, 10) == []
+        assert time.perf_counter() - started_at < 0.1
+
+
+class FakeContext:
+    def __init__(self, metadata) -> None:
+        self.metadata = metadata
+        self.code = None
+
+    def invocation_metadata(self):
+        return self.metadata
+
+    def peer(self):
+        return "ipv4:127.0.0.1:1234"
+
+    def set_trailing_metadata(self, metadata):
+        pass
+
+    async def abort(self, code, details):
+        self.code = code
+        raise grpc.RpcError(details)
+
+
+@pytest.mark.asyncio
+async def test_parse_near_metadata():
+    assert await parse_near_metadata(FakeContext(())) is None
+    assert await parse_near_metadata(
+        FakeContext((("x-near", "37.5,127.0"), ("x-near-limit", "3")))
+    ) == (37.5, 127.0, 3, None)
+    for metadata in (
+        (("x-near", "127.0,37.5"),),
+        (("x-near", "37.5,181"),),
+        (("x-near", "nan,127.0"),),
+        (("x-near", "37.5"),),
+        (("x-near", "37.5,127.0"), ("x-near-limit", "-1")),
+        (("x-near", "37.5,127.0"), ("x-near-radius-km", "-3")),
+        (("x-near", "37.5,127.0"), ("x-near-radius-km", "nan")),
+    ):
+        context = FakeContext(metadata)
+        with pytest.raises(grpc.RpcError):
+            await parse_near_metadata(context)
+        assert context.code == grpc.StatusCode.INVALID_ARGUMENT
+
+
+class FakeService(Service):
+    async def get_libraries(self):
+        return [
+            Library(
+                id="fake:1",
+                name="Fake",
+                coordinate=Coordinate(latitude=37.5, longitude=127.0),
+            )
+        ]
+
+    async def search(self, keyword, library_ids):
+        yield
+
+
+@pytest.mark.asyncio
+async def test_get_libraries_near_skips_ids_from_another_table(monkeypatch):
+    monkeypatch.setattr(app.resolver, "services", {"fake": FakeService()})
+    resolver = Resolver()
+    update = resolver.library_index.update
+
+    def rebuilt_elsewhere(libraries):
+        # Another request's table wins the shared index in the meantime.
+        return update([*libraries, *other])
+
+    other = [
+        Library(
+            id="other:1",
+            name="Other",
+            coordinate=Coordinate(latitude=37.5, longitude=127.0001),
+        )
+    ]
+    monkeypatch.setattr(resolver.library_index, "update", rebuilt_elsewhere)
+    response = await resolver.GetLibraries(
+        GetLibrariesRequest(), FakeContext((("x-near", "37.5,127.0"),))
+    )
+    assert [library.id for library in response.libraries] == ["fake:1"]
+
+
+def test_library_index_rebuilds_on_change():
+    libraries = [
+        Library(id="gdlib:MA", name="성내도서관"),
+        Library(
+            id="gdlib:BR",
+            name="해공도서관",
+            coordinate=Coordinate(latitude=37.53, longitude=127.12),
+        ),
+    ]
+    registry = LibraryIndex()
+    index = registry.update(libraries)
+    assert len(index) == 1
+    assert registry.update(list(libraries)) is index
+
+    libraries[0].coordinate = Coordinate(latitude=37.53, longitude=127.13)
+    assert len(registry.update(libraries)) == 2
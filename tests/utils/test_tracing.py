@@ -0,0 +1,134 @@
+import grpc
+import pytest
+import sentry_sdk
+from heekkr.resolver_pb2 import SearchRequest
+from sentry_sdk.transport import Transport
+
+import app.resolver
+from app.resolver import Resolver
+from app.utils import tracing
+from app.utils.admission import Rejected
+
+
+class CapturingTransport(Transport):
+    def __init__(self, options=None) -> None:
+        super().__init__(options)
+        self.transactions = []
+
+    def capture_envelope(self, envelope) -> None:
+        for item in envelope.items:
+            if item.type == "transaction":
+                self.transactions.append(item.payload.json)
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    monkeypatch.setattr(tracing, "SENTRY_TRACES_SAMPLE_RATE", 0.0)
+    transport = CapturingTransport()
+    sentry_sdk.init(
+        dsn="http://key@localhost/1",
+        transport=transport,
+        traces_sampler=tracing.traces_sampler,
+    )
+    yield transport
+    sentry_sdk.init()
+
+
+def test_sampler(monkeypatch):
+    monkeypatch.setattr(tracing, "SENTRY_TRACES_SAMPLE_RATE", 0.05)
+
+    def context(name, parent_sampled=None):
+        return {
+            "transaction_context": {"name": name},
+            "parent_sampled": parent_sampled,
+        }
+
+    assert tracing.traces_sampler(context(tracing.SEARCH_TRANSACTION)) == 0.05
+    assert tracing.traces_sampler(context("heekkr.Resolver/GetLibraries")) == 0.05
+    assert tracing.traces_sampler(context(tracing.SEARCH_TRANSACTION, True)) == 1.0
+
+
+def test_unsampled_searches_keep_only_slow_or_failed(transport, monkeypatch):
+    with tracing.transaction(tracing.SEARCH_TRANSACTION):
+        # Unsampled searches skip span bookkeeping entirely.
+        assert tracing.span("http.client", "gdlib search") is tracing._no_span
+    assert transport.transactions == []
+
+    with pytest.raises(RuntimeError):
+        with tracing.transaction("heekkr.Resolver/GetLibraries"):
+            raise RuntimeError()
+    assert transport.transactions == []
+
+    with pytest.raises(RuntimeError):
+        with tracing.transaction(tracing.SEARCH_TRANSACTION):
+            raise RuntimeError()
+
+    monkeypatch.setattr(tracing, "SENTRY_SLOW_SEARCH", 0)
+    with tracing.transaction(tracing.SEARCH_TRANSACTION):
+        pass
+
+    failed, slow = transport.transactions
+    assert failed["transaction"] == tracing.SEARCH_TRANSACTION
+    assert failed["tags"]["failed"] == "true"
+    assert slow["tags"]["slow"] == "true"
+
+
+def test_sampled_searches_record_spans(transport, monkeypatch):
+    monkeypatch.setattr(tracing, "SENTRY_TRACES_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(tracing, "SENTRY_SLOW_SEARCH", 0)
+    with tracing.transaction(tracing.SEARCH_TRANSACTION):
+        with tracing.span("http.client", "gdlib search"):
+            pass
+
+    (slow,) = transport.transactions
+    assert slow["tags"]["slow"] == "true"
+    assert [s["description"] for s in slow["spans"]] == ["gdlib search"]
+
+
+class AbortingContext:
+    def __init__(self) -> None:
+        self.code = None
+
+    def invocation_metadata(self):
+        return ()
+
+    def peer(self):
+        return "ipv4:127.0.0.1:1234"
+
+    def set_trailing_metadata(self, metadata):
+        pass
+
+    async def abort(self, code, details):
+        # Like grpc.aio's AbortError, which carries no status code.
+        self.code = code
+        raise Exception(details)
+
+
+@pytest.mark.asyncio
+async def test_rejected_searches_are_not_kept_as_failed(transport, monkeypatch):
+    async def acquire(priority):
+        raise Rejected("full")
+
+    monkeypatch.setattr(app.resolver, "services", {})
+    resolver = Resolver()
+    monkeypatch.setattr(resolver.admission, "acquire", acquire)
+
+    async def search():
+        context = AbortingContext()
+        with pytest.raises(Exception, match="full"):
+            async for _ in resolver.Search(SearchRequest(term="test"), context):
+                pass
+        assert context.code == grpc.StatusCode.RESOURCE_EXHAUSTED
+
+    await search()
+    assert transport.transactions == []
+
+    monkeypatch.setattr(tracing, "SENTRY_TRACES_SAMPLE_RATE", 1.0)
+    await search()
+    (rejected,) = transport.transactions
+    assert rejected["tags"]["rejected"] == "true"
+    assert "failed" not in rejected["tags"]
+
+
+def test_span_without_transaction_is_a_no_op():
+    assert tracing.span("parse") is tracing._no_span
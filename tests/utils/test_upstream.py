@@ -0,0 +1,42 @@
+import pytest
+
+from app.utils.upstream import UpstreamStats, UpstreamTracker
+
+
+def test_upstream_stats_window():
+    stats = UpstreamStats(window=10)
+    stats.record(False, 5.0, now=0)
+    for i in range(9):
+        stats.record(True, 0.1 * (i + 1), now=20)
+
+    summary = stats.summary(now=25)
+    assert summary.count == 9
+    assert summary.success_rate == 1.0
+    assert summary.p90_latency == pytest.approx(0.8)
+    assert stats.summary(now=100).count == 0
+
+
+@pytest.mark.asyncio
+async def test_track_records_outcome():
+    tracker = UpstreamTracker()
+
+    async def ok():
+        yield 1
+        yield 2
+
+    async def broken():
+        yield 1
+        raise RuntimeError()
+
+    assert [item async for item in tracker.track("ok", ok())] == [1, 2]
+    with pytest.raises(RuntimeError):
+        async for _ in tracker.track("broken", broken()):
+            pass
+    early = tracker.track("early", ok())
+    async for _ in early:
+        break
+    await early.aclose()
+
+    assert tracker.get("ok").summary().success_rate == 1.0
+    assert tracker.get("broken").summary().success_rate == 0.0
+    assert tracker.get("early").summary().count == 0
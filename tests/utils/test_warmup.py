@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from app.core import Library, Service
+from app.utils.warmup import warm_up
+
+
+class FakeService(Service):
+    def __init__(self, delay: float = 0, error: Exception | None = None) -> None:
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def get_libraries(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return [Library(id="fake:1", name="Fake")]
+
+    def search(self, keyword, library_ids):
+        raise NotImplementedError()
+
+
+@pytest.mark.asyncio
+async def test_warm_up_within_budget():
+    services = {
+        "fast": FakeService(),
+        "broken": FakeService(error=RuntimeError("upstream down")),
+        "slow": FakeService(delay=10),
+    }
+    result = await warm_up(services, budget=0.1)
+
+    assert result.completed == ["fast"]
+    assert result.failed == ["broken"]
+    assert result.pending == ["slow"]
+    assert result.elapsed < 1
+    assert all(service.calls == 1 for service in services.values())
+
+
+@pytest.mark.asyncio
+async def test_warm_up_without_services():
+    result = await warm_up({}, budget=1)
+    assert result.completed == result.failed == result.pending == []